@@ -0,0 +1,115 @@
+import difflib
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from channels import normalize_name
+
+# one folder next to the .env holding an app index file per TV
+DEFAULT_APP_DIR = ".lg_apps"
+# installed apps rarely change, refresh the saved index in the background once it is this old
+DEFAULT_MAX_AGE = 24 * 60 * 60
+# a name the index doesn't know triggers a refetch at most this often
+MISS_REFRESH_INTERVAL = 60
+
+# everyday names -> app ids, only used when that app is actually installed on the TV
+ALIASES = {
+    "youtube": "youtube.leanback.v4",
+    "netflix": "netflix",
+    "prime": "amazon",
+    "prime video": "amazon",
+    "amazon": "amazon",
+    "hotstar": "jiohotstar",
+    "jio hotstar": "jiohotstar",
+    "disney": "com.disney.disneyplus-prod",
+    "disney plus": "com.disney.disneyplus-prod",
+    "browser": "com.webos.app.browser",
+    "live tv": "com.webos.app.livetv",
+    "tv": "com.webos.app.livetv",
+}
+
+def is_app_id(app: str) -> bool:
+    """webOS app ids are dotted ("youtube.leanback.v4"), names people type are not."""
+    return "." in app
+
+def shortcut_name(title: str) -> str:
+    """launch_<slug> method name for an app title, e.g. "Prime Video" -> launch_prime_video."""
+    return "launch_" + normalize_name(title).replace(" ", "_")
+
+class AppIndex:
+    """
+    Installed apps of one TV keyed by id, normalized title and alias, built from
+    list_launch_points() so launching by display name is a dict lookup.
+    """
+
+    def __init__(self, apps: Dict[str, str], fetched_at: float = None):
+        self.apps = dict(apps)  # app id -> title
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        self._by_title = {normalize_name(title): app_id for app_id, title in self.apps.items()}
+        self._by_alias = {alias: app_id for alias, app_id in ALIASES.items() if app_id in self.apps}
+        self._names = sorted(set(self._by_title) | set(self._by_alias))
+
+    @classmethod
+    def from_launch_points(cls, response: Optional[dict]) -> "AppIndex":
+        apps = {}
+        for point in (response or {}).get("launchPoints", []):
+            app_id = point.get("id")
+            if app_id and app_id not in apps:
+                apps[app_id] = point.get("title") or app_id
+        return cls(apps)
+
+    def is_stale(self, max_age: float = DEFAULT_MAX_AGE) -> bool:
+        return time.time() - self.fetched_at > max_age
+
+    def resolve(self, app: str, cutoff: float = 0.6) -> Optional[str]:
+        """App id for an id, title, alias or a close enough spelling of one of them."""
+        if app in self.apps:
+            return app
+        if is_app_id(app):
+            # an id we don't know is a different app, never something spelled like it
+            return None
+        name = normalize_name(app)
+        app_id = self._by_title.get(name) or self._by_alias.get(name)
+        if app_id:
+            return app_id
+        close = difflib.get_close_matches(name, self._names, 1, cutoff)
+        if close:
+            return self._by_title.get(close[0]) or self._by_alias[close[0]]
+        return None
+
+    def search(self, query: str, limit: int = 5) -> List[str]:
+        """Best matching app ids for a partial or misspelled name."""
+        name = normalize_name(query)
+        hits = [self._by_title.get(n) or self._by_alias[n] for n in self._names if n.startswith(name)]
+        hits += [self._by_title.get(n) or self._by_alias[n] for n in difflib.get_close_matches(name, self._names, limit, 0.5)]
+        return list(dict.fromkeys(hits))[:limit]
+
+    def shortcuts(self) -> Dict[str, str]:
+        """launch_<slug> name -> app id for every installed app and alias."""
+        names = {shortcut_name(title): app_id for app_id, title in self.apps.items()}
+        for alias, app_id in self._by_alias.items():
+            names.setdefault(shortcut_name(alias), app_id)
+        return names
+
+    def __len__(self):
+        return len(self.apps)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"fetched_at": self.fetched_at, "apps": self.apps}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["AppIndex"]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+            return cls(data["apps"], data.get("fetched_at", 0))
+        except (OSError, ValueError, KeyError):
+            return None
+
+def app_index_path(tv_ip: str, directory: str = DEFAULT_APP_DIR) -> str:
+    return os.path.join(directory, f"{tv_ip.replace(':', '_')}.json")
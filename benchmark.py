@@ -0,0 +1,125 @@
+"""
+Throughput/latency benchmarks for WebOSClient against the local mock TV (mock_tv.py).
+
+    python benchmark.py --latency 0.005 --requests 2000 --concurrency 50
+
+Prints one line per scenario so regressions show up as numbers.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import tempfile
+import time
+from typing import Dict, List
+
+import client
+import discover
+import mock_tv
+from credentials import CredentialStore
+from description_cache import DescriptionCache
+
+def _summary(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(round(fraction * (len(samples) - 1))))] * 1000
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
+
+def _report(name: str, count: int, elapsed: float, samples: List[float] = None):
+    line = f"{name:<28} {count:>6} ops  {elapsed:8.3f} s  {count / elapsed:10.1f} ops/s"
+    if samples:
+        stats = _summary(samples)
+        line += f"  p50 {stats['p50']:7.2f} ms  p95 {stats['p95']:7.2f} ms  p99 {stats['p99']:7.2f} ms"
+    print(line)
+
+async def bench_connect(host: str, key: str, rounds: int, store: CredentialStore):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        connector = client.WebOSClient(host, client_key=key, auto_reconnect=False, credential_store=store)
+        t0 = time.perf_counter()
+        await connector.connect()
+        samples.append(time.perf_counter() - t0)
+        await connector.close()
+    _report("connect+register", rounds, time.perf_counter() - started, samples)
+
+async def bench_sequential(connector: client.WebOSClient, count: int):
+    samples = []
+    started = time.perf_counter()
+    for _ in range(count):
+        t0 = time.perf_counter()
+        await connector.get_volume()
+        samples.append(time.perf_counter() - t0)
+    _report("send_command sequential", count, time.perf_counter() - started, samples)
+
+async def bench_concurrent(connector: client.WebOSClient, count: int, concurrency: int):
+    samples = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            t0 = time.perf_counter()
+            await connector.get_volume()
+            samples.append(time.perf_counter() - t0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    _report(f"send_command x{concurrency}", count, time.perf_counter() - started, samples)
+
+async def bench_buttons(connector: client.WebOSClient, count: int):
+    await connector.connect_input()
+    started = time.perf_counter()
+    await connector.play_macro(["RIGHT"] * count, pacing=0)
+    _report("input buttons", count, time.perf_counter() - started)
+
+async def bench_discovery(rounds: int, timeout: float):
+    # measure real description fetches, not hits in (or writes to) the user's description cache
+    descriptions = discover.descriptions = DescriptionCache(path=None)
+    samples = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        descriptions.clear()
+        t0 = time.perf_counter()
+        found = await discover.discover_lg_tv_async(timeout=timeout)
+        if found is None:
+            print("discovery: mock TV not found (is multicast blocked?)")
+            return
+        samples.append(time.perf_counter() - t0)
+    _report("ssdp discovery", rounds, time.perf_counter() - started, samples)
+
+async def run(args):
+    tv = mock_tv.MockTV(args.host, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    await tv.start(ssdp=not args.no_discovery)
+    # the mock's key has no place in the real credential store
+    scratch = tempfile.TemporaryDirectory()
+    store = CredentialStore(os.path.join(scratch.name, "credentials.json"))
+    try:
+        await bench_connect(args.host, tv.client_key, args.connects, store)
+        connector = client.WebOSClient(args.host, client_key=tv.client_key, auto_reconnect=False, credential_store=store)
+        await connector.connect()
+        try:
+            await bench_sequential(connector, args.requests)
+            await bench_concurrent(connector, args.requests, args.concurrency)
+            await bench_buttons(connector, args.buttons)
+        finally:
+            await connector.close()
+        if not args.no_discovery:
+            await bench_discovery(args.discoveries, args.discovery_timeout)
+    finally:
+        await tv.stop()
+        scratch.cleanup()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark WebOSClient against the local mock TV.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock TV latency per answer (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--connects", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--buttons", type=int, default=1000)
+    parser.add_argument("--discoveries", type=int, default=5)
+    parser.add_argument("--discovery-timeout", type=float, default=5)
+    parser.add_argument("--no-discovery", action="store_true", help="skip the SSDP benchmark (no multicast here)")
+    logging.basicConfig(level=logging.WARNING, format="%(message)s")
+    asyncio.run(run(parser.parse_args()))
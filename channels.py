@@ -0,0 +1,227 @@
+import bisect
+import difflib
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# one folder next to the .env holding a catalog file per TV
+DEFAULT_CATALOG_DIR = ".lg_channels"
+# a channel the catalog doesn't know triggers a refetch of the whole list at most this often
+MISS_REFRESH_INTERVAL = 60
+
+def normalize_name(name: str) -> str:
+    """Lowercase, accent and punctuation free form of a channel name used by every name index."""
+    name = unicodedata.normalize("NFKD", name or "").encode("ascii", "ignore").decode()
+    return re.sub(r"[^a-z0-9]+", " ", name.lower()).strip()
+
+def _parse_number(channel: dict) -> Tuple[int, int]:
+    """(major, minor) of a channelList entry; "5-1" style numbers carry the minor part."""
+    major = channel.get("majorNumber")
+    minor = channel.get("minorNumber")
+    if major is None:
+        number = str(channel.get("channelNumber", "0"))
+        major_text, _, minor_text = number.replace(".", "-").partition("-")
+        major = int(major_text) if major_text.isdigit() else 0
+        minor = int(minor_text) if minor_text.isdigit() else 0
+    return int(major), int(minor or 0)
+
+class Channel:
+    __slots__ = ("channel_id", "name", "major", "minor")
+
+    def __init__(self, channel_id: str, name: str, major: int, minor: int):
+        self.channel_id = channel_id
+        self.name = name
+        self.major = major
+        self.minor = minor
+
+    @property
+    def number(self) -> str:
+        return f"{self.major}-{self.minor}" if self.minor else str(self.major)
+
+    def __repr__(self):
+        return f"Channel({self.number} {self.name!r} {self.channel_id})"
+
+class ChannelCatalog:
+    """
+    Compact, indexed copy of the TV's channel list.
+    Channels are kept in parallel arrays (ids, names, major/minor numbers) with
+    dict indexes by number, channelId and normalized name, plus a sorted name
+    list for prefix search, so tuning "205" or "BBC" never scans the list.
+    """
+    __slots__ = ("_ids", "_names", "_major", "_minor", "_by_id", "_by_number", "_by_name",
+                 "_sorted_names", "checksum")
+
+    def __init__(self, channels: Iterable[dict] = ()):
+        self._ids: List[str] = []
+        self._names: List[str] = []
+        self._major = array("i")
+        self._minor = array("i")
+        self.checksum = ""
+        self._rebuild(channels)
+
+    # ---- building ----
+    @staticmethod
+    def _checksum(channels: List[dict]) -> str:
+        return hashlib.sha1(json.dumps(channels, sort_keys=True).encode()).hexdigest()
+
+    def _rebuild(self, channels: Iterable[dict]):
+        channels = [c for c in channels if c.get("channelId")]
+        self._ids = [c["channelId"] for c in channels]
+        self._names = [c.get("channelName", "") for c in channels]
+        numbers = [_parse_number(c) for c in channels]
+        self._major = array("i", (major for major, _ in numbers))
+        self._minor = array("i", (minor for _, minor in numbers))
+        self.checksum = self._checksum([self._entry(i) for i in range(len(self._ids))])
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {channel_id: i for i, channel_id in enumerate(self._ids)}
+        self._by_number: Dict[Tuple[int, int], int] = {}
+        self._by_name: Dict[str, int] = {}
+        for i in range(len(self._ids)):
+            # first one wins, the TV lists the preferred duplicate first
+            self._by_number.setdefault((self._major[i], self._minor[i]), i)
+            self._by_name.setdefault(normalize_name(self._names[i]), i)
+        self._sorted_names = sorted(self._by_name)
+
+    @classmethod
+    def from_channel_list(cls, response: Optional[dict]) -> "ChannelCatalog":
+        """Build from a get_channel_list() response."""
+        return cls((response or {}).get("channelList", []))
+
+    def update(self, response: Optional[dict]) -> Dict[str, int]:
+        """
+        Apply a fresh get_channel_list() response and return how many channels were
+        added/removed/changed. Renames and additions are patched in place; only
+        removals (rare, after a rescan) rebuild the arrays.
+        """
+        channels = [c for c in (response or {}).get("channelList", []) if c.get("channelId")]
+        incoming = {c["channelId"]: c for c in channels}
+        removed = [channel_id for channel_id in self._ids if channel_id not in incoming]
+        if removed:
+            before = set(self._ids)
+            changed = sum(1 for c in channels if c["channelId"] in before and self._differs(self._by_id[c["channelId"]], c))
+            added = len(incoming.keys() - before)
+            self._rebuild(channels)
+            return {"added": added, "removed": len(removed), "changed": changed}
+
+        added = changed = 0
+        for channel in channels:
+            index = self._by_id.get(channel["channelId"])
+            major, minor = _parse_number(channel)
+            if index is None:
+                self._ids.append(channel["channelId"])
+                self._names.append(channel.get("channelName", ""))
+                self._major.append(major)
+                self._minor.append(minor)
+                added += 1
+            elif self._differs(index, channel):
+                self._names[index] = channel.get("channelName", "")
+                self._major[index] = major
+                self._minor[index] = minor
+                changed += 1
+        if added or changed:
+            self.checksum = self._checksum([self._entry(i) for i in range(len(self._ids))])
+            self._reindex()
+        return {"added": added, "removed": 0, "changed": changed}
+
+    def _differs(self, index: int, channel: dict) -> bool:
+        return (self._names[index] != channel.get("channelName", "")
+                or (self._major[index], self._minor[index]) != _parse_number(channel))
+
+    # ---- lookups ----
+    def _channel(self, index: int) -> Channel:
+        return Channel(self._ids[index], self._names[index], self._major[index], self._minor[index])
+
+    def by_id(self, channel_id: str) -> Optional[Channel]:
+        index = self._by_id.get(channel_id)
+        return None if index is None else self._channel(index)
+
+    def by_number(self, major: int, minor: int = 0) -> Optional[Channel]:
+        index = self._by_number.get((int(major), int(minor)))
+        return None if index is None else self._channel(index)
+
+    def by_name(self, name: str) -> Optional[Channel]:
+        index = self._by_name.get(normalize_name(name))
+        return None if index is None else self._channel(index)
+
+    def search_prefix(self, prefix: str, limit: int = 10) -> List[Channel]:
+        """Channels whose normalized name starts with `prefix`, alphabetically."""
+        prefix = normalize_name(prefix)
+        start = bisect.bisect_left(self._sorted_names, prefix)
+        matches = []
+        for name in self._sorted_names[start:]:
+            if not name.startswith(prefix) or len(matches) >= limit:
+                break
+            matches.append(self._channel(self._by_name[name]))
+        return matches
+
+    def search(self, query: str, limit: int = 5, cutoff: float = 0.6) -> List[Channel]:
+        """Fuzzy name search, best match first (exact and prefix hits come before close spellings)."""
+        query = normalize_name(query)
+        if query in self._by_name:
+            return [self._channel(self._by_name[query])]
+        matches = self.search_prefix(query, limit)
+        if len(matches) < limit:
+            seen = {c.channel_id for c in matches}
+            for name in difflib.get_close_matches(query, self._sorted_names, limit, cutoff):
+                channel = self._channel(self._by_name[name])
+                if channel.channel_id not in seen:
+                    matches.append(channel)
+        return matches[:limit]
+
+    def resolve(self, channel) -> Optional[Channel]:
+        """
+        Find a channel from whatever the caller has: a channelId, a number
+        (205, "205", "5-1", "5.1") or a (possibly misspelled) name.
+        """
+        if isinstance(channel, int):
+            return self.by_number(channel)
+        text = str(channel).strip()
+        found = self.by_id(text)
+        if found:
+            return found
+        number = re.fullmatch(r"(\d+)(?:[-.](\d+))?", text)
+        if number:
+            found = self.by_number(int(number.group(1)), int(number.group(2) or 0))
+            if found:
+                return found
+        matches = self.search(text, limit=1)
+        return matches[0] if matches else None
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        return (self._channel(i) for i in range(len(self._ids)))
+
+    # ---- persistence ----
+    def _entry(self, index: int) -> dict:
+        return {
+            "channelId": self._ids[index],
+            "channelName": self._names[index],
+            "majorNumber": self._major[index],
+            "minorNumber": self._minor[index],
+        }
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"checksum": self.checksum, "channelList": [self._entry(i) for i in range(len(self._ids))]}, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ChannelCatalog"]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls(json.load(f).get("channelList", []))
+        except (OSError, ValueError):
+            return None
+
+def catalog_path(tv_ip: str, directory: str = DEFAULT_CATALOG_DIR) -> str:
+    return os.path.join(directory, f"{tv_ip.replace(':', '_')}.json")
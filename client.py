@@ -1,47 +1,206 @@
 import asyncio
 import websockets
 import json
+import logging
 import ssl
-import os
-from dotenv import set_key, find_dotenv
-from config import settings
+import time
+import credentials
+import macros
+from apps import MISS_REFRESH_INTERVAL, AppIndex, app_index_path, is_app_id
+from credentials import CredentialStore
+from channels import ChannelCatalog, catalog_path
+from channels import MISS_REFRESH_INTERVAL as CHANNEL_MISS_REFRESH_INTERVAL
+from health import HealthMonitor, CLOSED, UNHEALTHY
+from instrumentation import Metrics
+from response_cache import ResponseCache
+from scheduler import CommandScheduler
+
+logger = logging.getLogger(__name__)
+
+# read-only endpoints worth caching, and for how long (seconds)
+CACHE_TTLS = {
+    "ssap://com.webos.applicationManager/listApps": 600,
+    "ssap://com.webos.applicationManager/listLaunchPoints": 600,
+    "ssap://tv/getChannelList": 3600,
+    "ssap://tv/getExternalInputList": 60,
+    "ssap://system/getSystemInfo": 24 * 3600,
+    "ssap://com.webos.service.connectionmanager/getinfo": 24 * 3600,
+}
+
+# write commands and the cached responses they make stale
+CACHE_INVALIDATIONS = {
+    "ssap://system.launcher/launch": (
+        "ssap://com.webos.applicationManager/listApps",
+        "ssap://com.webos.applicationManager/listLaunchPoints",
+    ),
+    "ssap://tv/switchInput": ("ssap://tv/getExternalInputList",),
+}
+
+# marks the end of a subscription stream
+_END = object()
+
+# how long a first pairing may wait for someone to accept the prompt on the TV
+PAIRING_TIMEOUT = 60.0
+
+class Subscription:
+    """
+    Stream of change events pushed by the TV for one ssap "subscribe" request.
+    Use it with `async for event in sub`, or give WebOSClient.subscribe a callback
+    and every event payload is handed to it instead of being queued.
+    """
+
+    def __init__(self, client, msg_id, uri, payload=None, callback=None):
+        self.client = client
+        self.id = msg_id
+        self.uri = uri
+        self.payload = payload or {}
+        self.callback = callback
+        self.closed = False
+        self._queue = asyncio.Queue()
+
+    def _deliver(self, resp_dict):
+        if resp_dict.get("type") == "error":
+            self._end(Exception(f"Subscription to {self.uri} failed: {resp_dict.get('error', resp_dict)}"))
+            self.client._subscriptions.pop(self.id, None)
+            return
+        payload = resp_dict.get("payload", resp_dict)
+        if self.callback is None:
+            self._queue.put_nowait(payload)
+            return
+        try:
+            result = self.callback(payload)
+        except Exception:
+            # a broken callback must not take the reader (and the connection) down with it
+            logger.exception("Subscription callback for %s failed", self.uri)
+            return
+        if asyncio.iscoroutine(result):
+            asyncio.ensure_future(self._guarded(result))
+
+    async def _guarded(self, coro):
+        try:
+            await coro
+        except Exception:
+            logger.exception("Subscription callback for %s failed", self.uri)
+
+    def _end(self, error=None):
+        if self.closed:
+            return
+        self.closed = True
+        if error is not None:
+            self._queue.put_nowait(error)
+        self._queue.put_nowait(_END)
+
+    def message(self):
+        """The subscribe message, also re-sent after an automatic reconnect."""
+        return json.dumps({"type": "subscribe", "id": self.id, "uri": self.uri, "payload": self.payload})
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        event = await self._queue.get()
+        if event is _END:
+            raise StopAsyncIteration
+        if isinstance(event, Exception):
+            raise event
+        return event
+
+    async def unsubscribe(self):
+        """Tell the TV to stop sending events and end the stream."""
+        if self.closed:
+            return
+        self.client._subscriptions.pop(self.id, None)
+        self._end()
+        try:
+            await self.client._send_raw(json.dumps({"type": "unsubscribe", "id": self.id}))
+        except (websockets.ConnectionClosed, ConnectionError):
+            pass  # no socket, no subscription on the TV either
+        logger.info("Unsubscribed from %s", self.uri)
 
 class WebOSClient:
 
-    def __init__(self, tv_ip, client_key=settings.client_key):
+    def __init__(self, tv_ip, client_key=None, command_timeout: float = 10.0,
+                 auto_reconnect: bool = True, reconnect_max_delay: float = 30.0, reconnect_timeout: float = 60.0,
+                 cache_ttls: dict = None, cache_size: int = 64,
+                 metrics: Metrics = None, log_payloads: bool = False,
+                 rate_limit: float = None, burst: int = 5, heartbeat_interval: float = 3.0,
+                 mac: str = None, uuid: str = None, credential_store: CredentialStore = None,
+                 recorder=None):
+        # every TV has its own client-key, found by whichever id we know it by
+        self.credentials = credentials.store if credential_store is None else credential_store
+        self.mac = mac
+        self.uuid = uuid
+        if client_key is None:
+            client_key = self.credentials.lookup(tv_ip, mac, uuid)
+        if client_key is None:
+            # keys paired before the credential store existed live in .env,
+            # pydantic-settings is only loaded for those
+            from config import settings
+            client_key = settings.client_key
         self.tv_ip = tv_ip
         self.uri = f"wss://{tv_ip}:3001"
         self.client_key = client_key
         self.ws = None
         self.input_ws = None
         self.request_id = 0
+        # every request in flight waits on its own future, keyed by the message id
+        self.command_timeout = command_timeout
+        self._pending = {}
+        self._subscriptions = {}
+        self._reader_task = None
+        # supervised connection - when the socket dies we reconnect with exponential backoff
+        # and commands issued meanwhile wait on _connected instead of failing
+        self.auto_reconnect = auto_reconnect
+        self.reconnect_max_delay = reconnect_max_delay
+        self.reconnect_timeout = reconnect_timeout
+        self._connected = asyncio.Event()
+        self._closing = False
+        self._reconnect_task = None
+        # set when the TV refused a reconnect, commands fail with it instead of waiting
+        self._reconnect_error = None
+        # counters/latencies/hooks, and whether full payloads get dumped to the debug log
+        self.metrics = metrics or Metrics()
+        self.log_payloads = log_payloads
+        # optional recorder.Recorder that logs every raw frame on both sockets for replay
+        self.recorder = recorder
+        # heartbeat + rolling RTT, notices a TV that silently went away within seconds
+        self.health = HealthMonitor(self, interval=heartbeat_interval)
+        # with a rate limit every command goes through the priority/collapsing scheduler
+        self.scheduler = CommandScheduler(self, rate_limit, burst) if rate_limit else None
+        # responses of the big read-only endpoints, see CACHE_TTLS
+        self.cache = ResponseCache({**CACHE_TTLS, **(cache_ttls or {})}, max_entries=cache_size)
+        # indexed channel list, persisted per TV so tuning by number/name doesn't refetch it
+        self.channel_catalog_path = catalog_path(tv_ip)
+        self._channel_catalog = None
+        self._channel_miss_refreshed = 0.0
+        # installed apps by id/title/alias, so launch_app("YouTube") resolves locally
+        self.app_index_path = app_index_path(tv_ip)
+        self._app_index = None
+        self._app_refresh_task = None
+        self._app_miss_refreshed = 0.0
+        # the register message only depends on the client-key, so it is serialized once
+        self._register_msg = None
+        self._register_msg_key = None
+        # one context for the client's lifetime, so every reconnect reuses the same TLS setup
         self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
         self.ssl_context.check_hostname = False
         self.ssl_context.verify_mode = ssl.CERT_NONE
 
     def save_client_key(self, new_key: str):
-        dotenv_path = find_dotenv(usecwd=True)
-        if not dotenv_path:
-            dotenv_path = os.path.join(os.getcwd(), ".env")
-            open(dotenv_path, 'a').close()
-
-        success, key, old = set_key(
-            dotenv_path=dotenv_path,
-            key_to_set="CLIENT_KEY",
-            value_to_set=new_key,
-            quote_mode="always",
-            export=False
-        )
-        if success:
-            print(f"Updated CLIENT_KEY in .env → {new_key}")
-            self.client_key = new_key
-            settings.client_key = new_key
-        else:
-            print("Failed to update .env – check permissions or path")
+        """Remember the key the TV handed out, under every id we know this TV by."""
+        self.credentials.save(new_key, ip=self.tv_ip, mac=self.mac, uuid=self.uuid)
+        self.client_key = new_key
 
-    async def connect(self, force_repair=False):
-        self.ws = await websockets.connect(self.uri, ping_interval=600, ping_timeout=600, ssl=self.ssl_context)
-        print(f"Connected to {self.uri}!")
+    async def connect(self, force_repair=False, open_timeout: float = 10):
+        self._closing = False
+        self._reconnect_error = None
+        await self._open(self._register_message(force_repair), open_timeout, pairing=force_repair or not self.client_key)
+        self._connected.set()
+
+    def _register_message(self, force_repair=False):
+        """Serialized register message, built once per client-key and reused on every reconnect."""
+        if not force_repair and self.client_key and self._register_msg_key == self.client_key:
+            return self._register_msg
 
         register_payload = {
             "forcePairing": force_repair or not self.client_key,
@@ -129,9 +288,9 @@ class WebOSClient:
 
         if self.client_key and not force_repair:
             register_payload["client-key"] = self.client_key
-            print("Using saved client-key")
+            logger.info("Using saved client-key")
         else:
-            print("Forcing pairing prompt - ACCEPT ON TV WITH REMOTE!")
+            logger.warning("Forcing pairing prompt - ACCEPT ON TV WITH REMOTE!")
 
         register_msg = {
             "type": "register",
@@ -139,26 +298,208 @@ class WebOSClient:
             "payload": register_payload
         }
 
-        await self.ws.send(json.dumps(register_msg))
-        print("Sent register!")
+        serialized = json.dumps(register_msg)
+        if self.client_key and not force_repair:
+            self._register_msg = serialized
+            self._register_msg_key = self.client_key
+        return serialized
+
+    async def _open(self, register_msg, open_timeout: float = 10, pairing: bool = False):
+        """Open the main socket, register with the TV and start the reader."""
+        self.health.connecting()
+        loop = asyncio.get_running_loop()
+        # open_timeout covers the handshake and the registration, a TV that takes the
+        # socket but never registers must not hang us (pairing waits for a human)
+        limit = max(open_timeout, PAIRING_TIMEOUT) if pairing else open_timeout
+        deadline = loop.time() + limit
+        # keepalive is the health monitor's job, it adapts to the link instead of a fixed 10 minutes
+        self.ws = await websockets.connect(self.uri, ping_interval=None, ssl=self.ssl_context, open_timeout=open_timeout)
+        logger.info("Connected to %s!", self.uri)
+        try:
+            await asyncio.wait_for(self._register(register_msg), max(0.0, deadline - loop.time()))
+        except BaseException as e:
+            # don't leave a half-open socket behind, a reconnect opens a fresh one anyway
+            ws, self.ws = self.ws, None
+            try:
+                await ws.close()
+            except Exception:
+                pass
+            if isinstance(e, asyncio.TimeoutError):
+                raise TimeoutError(f"TV at {self.uri} did not register within {limit}s") from None
+            raise
+
+        # from now on only the reader touches ws.recv(), callers just await their future
+        self._reader_task = asyncio.create_task(self._read_loop())
+        self.health.start()
+
+    async def _register(self, register_msg):
+        """Send the register message and wait for the TV to accept it."""
+        await self._send_raw(register_msg)
+        logger.debug("Sent register!")
 
         while True:
             resp = await self.ws.recv()
+            self._record("main", "in", resp)
             resp_dict = json.loads(resp)
-            print("TV:", resp)
+            if self.log_payloads:
+                logger.debug("TV: %s", resp)
             if resp_dict.get("type") == "registered":
                 client_key = resp_dict["payload"].get("client-key")
-                if client_key and self.client_key != client_key:
+                if client_key:
+                    # also files a key that came from .env under this TV, a no-op once it is stored
                     self.save_client_key(client_key)
-                print("Registered successfully!")
+                logger.info("Registered successfully!")
                 break
             elif resp_dict.get("type") == "error":
-                print("Error:", resp_dict)
+                logger.error("Register error: %s", resp_dict)
                 if "permissions" in str(resp_dict).lower():
                     raise PermissionError("Permissions error - clear TV pairings (Settings > Devices > External Devices > Remove all), reboot TV, then run with force_repair=True")
                 raise Exception("Register failed")
 
-    async def send_command(self, uri, payload=None):
+    async def _read_loop(self):
+        """Background task that hands every response to the request waiting on its id."""
+        error = ConnectionError("Connection to the TV closed")
+        try:
+            async for resp in self.ws:
+                self.health.frame_received()
+                self._record("main", "in", resp)
+                try:
+                    resp_dict = json.loads(resp)
+                except ValueError:
+                    logger.warning("Ignoring non-JSON frame from TV: %r", resp[:200])
+                    continue
+                subscription = self._subscriptions.get(resp_dict.get("id"))
+                if subscription is not None:
+                    subscription._deliver(resp_dict)
+                    continue
+                future = self._pending.pop(resp_dict.get("id"), None)
+                if future is None:
+                    logger.debug("Unmatched frame from TV: %s", resp)
+                    continue
+                if not future.done():
+                    future.set_result(resp_dict)
+        except websockets.ConnectionClosed as e:
+            error = ConnectionError(f"Connection to the TV closed: {e}")
+        finally:
+            self._connected.clear()
+            self.health.stop(CLOSED if self._closing else UNHEALTHY)
+            # nobody is going to answer these anymore, fail them instead of hanging
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+            if self.auto_reconnect and not self._closing:
+                # subscriptions stay open, they are re-sent once we are back
+                logger.warning("Lost connection to %s, reconnecting...", self.uri)
+                self._reconnect_task = asyncio.create_task(self._reconnect())
+            else:
+                for subscription in self._subscriptions.values():
+                    subscription._end(error)
+                self._subscriptions.clear()
+
+    async def _reconnect(self):
+        """Reconnect with exponential backoff, then restore the input socket and subscriptions."""
+        had_input = self.input_ws is not None
+        if had_input:
+            # the pointer socket died with the TV, the path changes on every connect anyway
+            try:
+                await self.input_ws.close()
+            except Exception:
+                pass
+            self.input_ws = None
+
+        delay = 0.5
+        attempt = 0
+        while not self._closing:
+            attempt += 1
+            await asyncio.sleep(delay)
+            try:
+                await self._open(self._register_message(), pairing=not self.client_key)
+                break
+            except PermissionError as e:
+                logger.error("Reconnect rejected by the TV: %s", e)
+                # retrying won't change the TV's mind, only a new connect() (re-pairing) will
+                self._reconnect_error = e
+                for subscription in self._subscriptions.values():
+                    subscription._end(e)
+                self._subscriptions.clear()
+                return
+            except Exception as e:
+                logger.warning("Reconnect attempt %d failed: %r", attempt, e)
+                delay = min(delay * 2, self.reconnect_max_delay)
+        if self._closing:
+            return
+
+        self._connected.set()
+        # the TV may have changed anything while we were away
+        self.cache.invalidate()
+        logger.info("Reconnected to %s after %d attempt(s)", self.uri, attempt)
+        for subscription in list(self._subscriptions.values()):
+            await self._send_raw(subscription.message())
+        if had_input:
+            try:
+                await self.connect_input()
+            except Exception as e:
+                logger.warning("Failed to re-open the input socket: %r", e)
+
+    async def _ensure_connected(self):
+        """Return once the main socket is usable, waiting out a reconnect in progress."""
+        if self._connected.is_set():
+            return
+        if self._reconnect_error:
+            raise PermissionError(str(self._reconnect_error))
+        if not self.auto_reconnect or self._closing or (self._reconnect_task is None and self.ws is None):
+            raise ConnectionError("Not connected to the TV - call connect() first")
+        connected = asyncio.ensure_future(self._connected.wait())
+        waiting = {connected}
+        if self._reconnect_task and not self._reconnect_task.done():
+            # a reconnect that gives up ends the wait right away
+            waiting.add(self._reconnect_task)
+        try:
+            await asyncio.wait(waiting, timeout=self.reconnect_timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            connected.cancel()
+        if self._connected.is_set():
+            return
+        if self._reconnect_error:
+            raise PermissionError(str(self._reconnect_error))
+        raise ConnectionError(f"TV at {self.uri} did not come back within {self.reconnect_timeout}s")
+
+    def _record(self, channel: str, direction: str, frame):
+        if self.recorder is not None:
+            self.recorder.record(channel, direction, frame)
+
+    async def _send_raw(self, message, ws=None):
+        """ws.send on the main socket (the current one by default), recorded when a recorder is set."""
+        ws = ws or self.ws
+        if ws is None:
+            # e.g. the last reconnect attempt failed to register and dropped its socket
+            raise ConnectionError("Not connected to the TV")
+        await ws.send(message)
+        self._record("main", "out", message)
+
+    async def _send(self, message):
+        """Send on the main socket; with auto_reconnect the message is held back until the TV is back."""
+        while True:
+            await self._ensure_connected()
+            ws = self.ws
+            try:
+                await self._send_raw(message, ws)
+                return
+            except websockets.ConnectionClosed as e:
+                if not self.auto_reconnect:
+                    raise ConnectionError(f"Connection to the TV closed: {e}")
+                # the reader notices the same close and starts reconnecting
+                if self.ws is ws:
+                    self._connected.clear()
+
+    async def send_command(self, uri, payload=None, timeout: float = None):
+        if self.scheduler:
+            return await self.scheduler.submit_command(uri, payload, timeout)
+        return await self._send_request(uri, payload, timeout)
+
+    async def _send_request(self, uri, payload=None, timeout: float = None):
+        """Send one request right away and wait for its response."""
         self.request_id += 1
         msg = {
             "type": "request",
@@ -166,24 +507,73 @@ class WebOSClient:
             "uri": uri,
             "payload": payload or {}
         }
-        await self.ws.send(json.dumps(msg))
-        print(f"Sent request to {uri}")
-
-        resp = await self.ws.recv()
-        resp_dict = json.loads(resp)
-        print(f"Response: {resp_dict}")
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg["id"]] = future
+        self.metrics.record_send(uri)
+        self.metrics.emit("send", uri=uri, id=msg["id"], payload=msg["payload"])
+        started = time.perf_counter()
+        try:
+            await self._send(json.dumps(msg))
+            logger.debug("Sent request %s to %s", msg["id"], uri)
+            resp_dict = await asyncio.wait_for(future, timeout or self.command_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.record_error(uri)
+            self.metrics.emit("error", uri=uri, id=msg["id"], error="timeout")
+            raise TimeoutError(f"No response from TV for {uri}")
+        except Exception as e:
+            self.metrics.record_error(uri)
+            self.metrics.emit("error", uri=uri, id=msg["id"], error=e)
+            raise
+        finally:
+            self._pending.pop(msg["id"], None)
+        elapsed = time.perf_counter() - started
+        self.metrics.record_latency(uri, elapsed)
+        self.metrics.emit("receive", uri=uri, id=msg["id"], response=resp_dict, elapsed=elapsed)
+        logger.debug("Response %s from %s in %.1f ms", msg["id"], uri, elapsed * 1000)
+        if self.log_payloads:
+            logger.debug("Response payload: %s", resp_dict)
 
-        if resp_dict.get("id") != msg["id"]:
-            print("ID mismatch!")
-            return None
         if resp_dict.get("type") == "error":
-            print("TV Error:", resp_dict)
+            logger.warning("TV Error for %s: %s", uri, resp_dict.get("error", resp_dict))
+            self.metrics.record_error(uri)
             if "permissions" in str(resp_dict).lower():
                 raise PermissionError(f"Insufficient permissions for {uri}")
             return None
-        print(f"Payload: {resp_dict.get('payload', resp_dict)}")
+        if uri in CACHE_INVALIDATIONS:
+            self.cache.invalidate(*CACHE_INVALIDATIONS[uri])
         return resp_dict.get("payload", resp_dict)
 
+    async def cached_command(self, uri, payload=None, refresh: bool = False):
+        """send_command for read-only endpoints, answered from the response cache while fresh."""
+        if refresh:
+            self.cache.invalidate(uri)
+        return await self.cache.fetch(uri, payload, lambda: self.send_command(uri, payload))
+
+    async def subscribe(self, uri, payload=None, callback=None):
+        """
+        Send a "subscribe" request and return a Subscription that yields every
+        change the TV pushes for this uri, starting with the current state.
+        """
+        self.request_id += 1
+        subscription = Subscription(self, f"sub_{self.request_id}", uri, payload, callback)
+        self._subscriptions[subscription.id] = subscription
+        await self._send(subscription.message())
+        logger.info("Subscribed to %s", uri)
+        return subscription
+
+    # SUBSCRIPTIONS (pushed by the TV whenever the state changes)
+    async def subscribe_volume(self, callback=None):
+        return await self.subscribe("ssap://audio/getVolume", callback=callback)
+
+    async def subscribe_foreground_app(self, callback=None):
+        return await self.subscribe("ssap://com.webos.applicationManager/getForegroundAppInfo", callback=callback)
+
+    async def subscribe_power_state(self, callback=None):
+        return await self.subscribe("ssap://com.webos.service.tvpower/power/getPowerState", callback=callback)
+
+    async def subscribe_current_channel(self, callback=None):
+        return await self.subscribe("ssap://tv/getCurrentChannel", callback=callback)
+
     # AUDIO RELATED ENDPOINTS
     async def get_mute(self):
         return await self.send_command("ssap://audio/getMute")
@@ -209,17 +599,62 @@ class WebOSClient:
         return await self.send_command("ssap://audio/getStatus")
     
     # OPEN APPS
-    async def list_apps(self):
-        return await self.send_command("ssap://com.webos.applicationManager/listApps")
+    async def list_apps(self, refresh: bool = False):
+        return await self.cached_command("ssap://com.webos.applicationManager/listApps", refresh=refresh)
 
-    async def list_launch_points(self):
-        return await self.send_command("ssap://com.webos.applicationManager/listLaunchPoints")
+    async def list_launch_points(self, refresh: bool = False):
+        return await self.cached_command("ssap://com.webos.applicationManager/listLaunchPoints", refresh=refresh)
 
     async def get_foreground_app(self):
         return await self.send_command("ssap://com.webos.applicationManager/getForegroundAppInfo")
 
+    async def app_index(self, refresh: bool = False) -> AppIndex:
+        """
+        The installed apps index. A saved one is used straight away and, when it is
+        old, refreshed in the background; there is only a round trip when we have none.
+        """
+        if self._app_index is None and not refresh:
+            self._app_index = AppIndex.load(self.app_index_path)
+            if self._app_index is not None and self._app_index.is_stale():
+                self._app_refresh_task = asyncio.create_task(self._refresh_app_index())
+        if self._app_index is None or refresh:
+            await self._refresh_app_index()
+        return self._app_index
+
+    async def _refresh_app_index(self):
+        try:
+            index = AppIndex.from_launch_points(await self.list_launch_points(refresh=True))
+        except Exception as e:
+            logger.warning("Could not refresh the app index: %r", e)
+            index = None
+        if index:
+            index.save(self.app_index_path)
+            self._app_index = index
+        elif self._app_index is None:
+            self._app_index = AppIndex({})
+
+    def __getattr__(self, name):
+        # launch_<app> shortcuts for every installed app, e.g. launch_disney_plus()
+        if name.startswith("launch_") and self.__dict__.get("_app_index") is not None:
+            app_id = self._app_index.shortcuts().get(name)
+            if app_id:
+                async def launch(params: dict = None):
+                    return await self.launch_app(app_id, params)
+                return launch
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
     async def launch_app(self, app_id: str, params: dict = None):
-        payload = {"id": app_id}
+        """Launch by app id, title or alias ("YouTube", "prime video"), resolved from the app index."""
+        index = await self.app_index()
+        resolved = index.resolve(app_id)
+        if resolved is None and len(index) and not is_app_id(app_id) \
+                and time.monotonic() - self._app_miss_refreshed > MISS_REFRESH_INTERVAL:
+            # maybe installed since the index was saved
+            self._app_miss_refreshed = time.monotonic()
+            index = await self.app_index(refresh=True)
+            resolved = index.resolve(app_id)
+        # unknown to the index: maybe a hidden app, let the TV decide
+        payload = {"id": resolved or app_id}
         if params:
             payload["params"] = params
         return await self.send_command("ssap://system.launcher/launch", payload)
@@ -231,18 +666,48 @@ class WebOSClient:
     async def launch_jio_hotstar(self): return await self.launch_app("jiohotstar")
     # TV / CHANNELS
     # use this to get channelId
-    async def get_channel_list(self):             
-        return await self.send_command("ssap://tv/getChannelList")     
+    async def get_channel_list(self, refresh: bool = False):
+        return await self.cached_command("ssap://tv/getChannelList", refresh=refresh)
     async def get_current_channel(self):            
         return await self.send_command("ssap://tv/getCurrentChannel")
-    async def open_channel(self, channel_id: str): 
-        return await self.send_command("ssap://tv/openChannel", {"channelId": channel_id})
+    async def channel_catalog(self, refresh: bool = False) -> ChannelCatalog:
+        """The indexed channel list, loaded from disk if we have one, refetched from the TV on refresh."""
+        if self._channel_catalog is None and not refresh:
+            self._channel_catalog = ChannelCatalog.load(self.channel_catalog_path)
+        if self._channel_catalog is None or refresh:
+            response = await self.get_channel_list(refresh=refresh)
+            if self._channel_catalog is None:
+                self._channel_catalog = ChannelCatalog.from_channel_list(response)
+                changes = {"added": len(self._channel_catalog)}
+            else:
+                changes = self._channel_catalog.update(response)
+            if any(changes.values()):
+                self._channel_catalog.save(self.channel_catalog_path)
+                logger.info("Channel catalog updated: %s", changes)
+        return self._channel_catalog
+
+    async def open_channel(self, channel_id):
+        """Tune to a channel by channelId, number (205, "5-1") or name ("BBC One")."""
+        catalog = await self.channel_catalog()
+        found = catalog.resolve(channel_id)
+        if found is None and len(catalog) \
+                and time.monotonic() - self._channel_miss_refreshed > CHANNEL_MISS_REFRESH_INTERVAL:
+            # maybe the lineup changed since the catalog was saved
+            self._channel_miss_refreshed = time.monotonic()
+            catalog = await self.channel_catalog(refresh=True)
+            found = catalog.resolve(channel_id)
+        if found is None:
+            if len(catalog):
+                raise ValueError(f"Unknown channel {channel_id!r}")
+            # no channel list available, trust the caller gave us a channelId
+            return await self.send_command("ssap://tv/openChannel", {"channelId": str(channel_id)})
+        return await self.send_command("ssap://tv/openChannel", {"channelId": found.channel_id})
     async def channel_up(self):                   
         return await self.send_command("ssap://tv/channelUp")
     async def channel_down(self):                  
         return await self.send_command("ssap://tv/channelDown")
-    async def get_external_inputs(self):           
-        return await self.send_command("ssap://tv/getExternalInputList")
+    async def get_external_inputs(self, refresh: bool = False):
+        return await self.cached_command("ssap://tv/getExternalInputList", refresh=refresh)
     async def switch_input(self, input_id: str):   
         return await self.send_command("ssap://tv/switchInput", {"inputId": input_id})  # "HDMI1", "AV1" etc.
     
@@ -261,46 +726,117 @@ class WebOSClient:
     # SYSTEM / POWER
     async def power_off(self):                    
         return await self.send_command("ssap://system/turnOff")
-    async def get_system_info(self):     
-        return await self.send_command("ssap://system/getSystemInfo")
+    async def get_system_info(self, refresh: bool = False):
+        return await self.cached_command("ssap://system/getSystemInfo", refresh=refresh)
     async def get_power_state(self):      
         return await self.send_command("ssap://com.webos.service.tvpower/power/getPowerState")
     async def turn_off_screen(self):      
         return await self.send_command("ssap://com.webos.service.tvpower/power/turnOffScreen")
     async def turn_on_screen(self):       
         return await self.send_command("ssap://com.webos.service.tvpower/power/turnOnScreen")
+    async def get_network_info(self, refresh: bool = False):
+        return await self.cached_command("ssap://com.webos.service.connectionmanager/getinfo", refresh=refresh)
+
+    async def learn_mac(self):
+        """
+        MAC address of the TV for Wake-on-LAN: the wired one if it has a cable,
+        else Wi-Fi, else whatever the ARP table learned for its ip.
+        The TV's stored client-key is filed under it too, so it survives an ip change.
+        """
+        import wol
+        try:
+            info = await self.get_network_info() or {}
+        except Exception as e:
+            logger.debug("getinfo failed on %s: %r", self.tv_ip, e)
+            info = {}
+        mac = None
+        for key in ("wiredInfo", "wifiInfo"):
+            mac = (info.get(key) or {}).get("macAddress")
+            if mac:
+                mac = wol.normalize_mac(mac)
+                break
+        mac = mac or wol.mac_from_arp(self.tv_ip)
+        if mac and mac != self.mac:
+            self.mac = mac
+            if self.client_key:
+                self.save_client_key(self.client_key)
+        return mac
     
     async def connect_input(self):
         """Get and connect to the pointer/input websocket."""
         if self.input_ws:
-            print("Input socket already connected!")
+            logger.debug("Input socket already connected!")
             return
 
-        response = await self.send_command("ssap://com.webos.service.networkinput/getPointerInputSocket")
+        # straight to the TV, the scheduler may be the one waiting for this socket
+        response = await self._send_request("ssap://com.webos.service.networkinput/getPointerInputSocket")
         if not response or "socketPath" not in response:
             raise Exception("Failed to get input socket path")
         
         sock_path = response["socketPath"]
-        print(f"Got input socket: {sock_path}")
+        logger.debug("Got input socket: %s", sock_path)
 
-        self.input_ws = await websockets.connect(sock_path, ping_interval=600, ping_timeout=600, ssl=self.ssl_context)
-        print(f"Connected to input socket {sock_path}!")
+        self.input_ws = await websockets.connect(sock_path, ping_interval=self.health.interval,
+                                                 ping_timeout=self.health.max_timeout, ssl=self.ssl_context)
+        logger.info("Connected to input socket %s!", sock_path)
 
     async def disconnect_input(self):
         """Close the input websocket."""
         if self.input_ws:
             await self.input_ws.close()
             self.input_ws = None
-            print("Input socket closed.")
+            logger.info("Input socket closed.")
 
-    async def _send_input_button(self, button_name: str):
-        """Internal helper to send a button over input ws."""
+    async def _send_input_frame(self, frame: str):
+        """Internal helper to write one raw frame to the input ws."""
         if not self.input_ws:
             await self.connect_input()  # Auto-connect if needed
-        
-        payload = f"type:button\nname:{button_name}\n\n"
-        await self.input_ws.send(payload)
-        print(f"Sent button: {button_name}")
+
+        try:
+            await self.input_ws.send(frame)
+        except websockets.ConnectionClosed:
+            # input socket dropped on its own, open a fresh one and retry once
+            self.input_ws = None
+            await self.connect_input()
+            await self.input_ws.send(frame)
+        self._record("input", "out", frame)
+        self.metrics.record_input()
+        self.metrics.emit("input_send", frame=frame)
+
+    async def _send_input_button(self, button_name: str):
+        """Internal helper to send a button over input ws."""
+        if self.scheduler:
+            return await self.scheduler.submit_button(button_name)
+        await self._press_button(button_name)
+
+    async def _press_button(self, button_name: str):
+        await self._send_input_frame(macros.button_frame(button_name))
+        logger.debug("Sent button: %s", button_name)
+
+    async def play_macro(self, macro, pacing: float = None, repeat: int = 1):
+        """
+        Replay a macros.Macro (or a plain step list like ["HOME", "RIGHT*6", "ENTER"])
+        on the input socket, waiting `pacing` seconds between frames.
+        """
+        if not isinstance(macro, macros.Macro):
+            macro = macros.Macro("adhoc", macro)
+        pacing = macro.pacing if pacing is None else pacing
+        for _ in range(repeat):
+            for frame in macro.frames:
+                await self._send_input_frame(frame)
+                if pacing:
+                    await asyncio.sleep(pacing)
+        logger.debug("Played macro %s (%d frames)", macro.name, len(macro.frames) * repeat)
+
+    # POINTER CONTROL
+    async def pointer_move(self, dx: int, dy: int, drag: bool = False):
+        await self._send_input_frame(macros.move_frame(dx, dy, drag))
+
+    async def pointer_scroll(self, dx: int, dy: int):
+        await self._send_input_frame(macros.scroll_frame(dx, dy))
+
+    async def pointer_click(self):
+        await self._send_input_frame(macros.click_frame())
 
     # NAVIGATION / CURSOR CONTROL (for apps like YouTube)
     async def cursor_up(self):
@@ -324,9 +860,32 @@ class WebOSClient:
     async def go_home(self):
         await self._send_input_button("HOME")
     
+    def health_status(self) -> dict:
+        """Current health of the connection: state, smoothed RTT, idle time and missed heartbeats."""
+        return {"tv": self.tv_ip, **self.health.status()}
+
     # close the socket Gracefully
     async def close(self):
+        self._closing = True
+        self.health.stop(CLOSED)
+        if self.scheduler:
+            await self.scheduler.close()
+        if self._app_refresh_task:
+            self._app_refresh_task.cancel()
+            await asyncio.gather(self._app_refresh_task, return_exceptions=True)
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+            await asyncio.gather(self._reconnect_task, return_exceptions=True)
+            self._reconnect_task = None
+        for subscription in list(self._subscriptions.values()):
+            await subscription.unsubscribe()
         await self.disconnect_input()
         if self.ws:
-            print("Bye byee Socket Closing")
-            await self.ws.close()
\ No newline at end of file
+            logger.info("Bye byee Socket Closing")
+            await self.ws.close()
+        if self._reader_task:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+        self._connected.clear()
+        if self.recorder is not None:
+            self.recorder.flush()
\ No newline at end of file
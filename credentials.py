@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# pairing keys of every TV we have paired with, next to the .env
+DEFAULT_CREDENTIALS_PATH = ".lg_credentials.json"
+
+def _mac(mac: Optional[str]) -> Optional[str]:
+    # "A8-23-FE-..." and "a8:23:fe:..." are the same TV
+    return mac.lower().replace("-", ":") if mac else None
+
+class CredentialStore:
+    """
+    Client-keys of every paired TV. Each record holds the key plus whatever ids
+    we know the TV by ('uuid' from SSDP, 'mac', 'ip'); lookups try them from the
+    most to the least stable, so a TV that got a new ip from DHCP still finds its key.
+    The file is read once, on first use, and rewritten atomically (owner-only) on change.
+    """
+
+    def __init__(self, path: str = DEFAULT_CREDENTIALS_PATH):
+        self.path = path
+        self._records: Optional[List[Dict]] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[Dict]:
+        if self._records is None:
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._records = json.load(f)["devices"]
+            except (OSError, ValueError, KeyError):
+                self._records = []
+        return self._records
+
+    def _write(self):
+        tmp_path = f"{self.path}.tmp"
+        # client-keys are secrets, keep them away from other users of the machine
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"devices": self._records}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _find(self, client_key: Optional[str] = None, uuid: Optional[str] = None,
+              mac: Optional[str] = None, ip: Optional[str] = None) -> Optional[Dict]:
+        for field, value in (("client_key", client_key), ("uuid", uuid), ("mac", mac), ("ip", ip)):
+            if value:
+                for record in self._load():
+                    if record.get(field) == value:
+                        return record
+        return None
+
+    def lookup(self, ip: Optional[str] = None, mac: Optional[str] = None, uuid: Optional[str] = None) -> Optional[str]:
+        """Client-key of the TV known by any of these ids, None if it was never paired."""
+        with self._lock:
+            record = self._find(uuid=uuid, mac=_mac(mac), ip=ip)
+        return record["client_key"] if record else None
+
+    def save(self, client_key: str, ip: Optional[str] = None, mac: Optional[str] = None, uuid: Optional[str] = None):
+        """Store a key (new pairing) or attach more ids to it; ids another TV had before are moved over."""
+        ids = {field: value for field, value in (("uuid", uuid), ("mac", _mac(mac)), ("ip", ip)) if value}
+        with self._lock:
+            record = self._find(client_key=client_key) or self._find(uuid=ids.get("uuid"), mac=ids.get("mac"))
+            if record is None:
+                record = self._find(ip=ip)
+                # after a DHCP swap the ip belongs to another TV now, that one keeps its key
+                if record and any(ids.get(field) and record.get(field) not in (None, ids[field])
+                                  for field in ("uuid", "mac")):
+                    record = None
+            if record and all(record.get(field) == value for field, value in ids.items()) \
+                    and record["client_key"] == client_key:
+                return  # nothing new, no write
+            if record is None:
+                record = {}
+                self._load().append(record)
+            # an ip (or anything else) only ever belongs to one TV
+            for other in self._load():
+                if other is not record:
+                    for field, value in ids.items():
+                        if other.get(field) == value:
+                            other.pop(field)
+            record.update(ids, client_key=client_key, updated=time.time())
+            self._write()
+        logger.info("Saved client-key for %s", uuid or mac or ip)
+
+    def forget(self, client_key: str):
+        with self._lock:
+            record = self._find(client_key=client_key)
+            if record:
+                self._load().remove(record)
+                self._write()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
+
+# shared by every client in the process, so the file is only read once
+store = CredentialStore()
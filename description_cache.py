@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# descriptions are remembered between runs next to the device cache
+DEFAULT_DESCRIPTION_PATH = ".lg_descriptions.json"
+# what SSDP announces when a device doesn't say otherwise
+DEFAULT_MAX_AGE = 1800
+
+UPNP_NS = '{urn:schemas-upnp-org:device-1-0}'
+# description fields we look at, everything after them is never parsed
+FIELDS = ('manufacturer', 'modelName', 'friendlyName', 'modelDescription')
+
+def _is_lg(manufacturer: str) -> bool:
+    return 'lg' in manufacturer or 'lge' in manufacturer
+
+def parse_description(chunks: Iterable[bytes], ip: str) -> Optional[Dict[str, str]]:
+    """
+    Return the device info if the description XML belongs to an LG webOS TV, else None.
+    The XML is parsed incrementally as `chunks` arrive and reading stops as soon as
+    the answer is known: a non-LG manufacturer, or all four fields of the root device.
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    found: Dict[str, str] = {}
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _, el in parser.read_events():
+            name = el.tag[len(UPNP_NS):] if el.tag.startswith(UPNP_NS) else None
+            # the root device comes first, embedded devices don't get to overwrite it
+            if name in FIELDS and name not in found:
+                found[name] = (el.text or '').strip()
+        if 'manufacturer' in found and not _is_lg(found['manufacturer'].lower()):
+            break
+        if len(found) == len(FIELDS):
+            break
+
+    manuf_text = found.get('manufacturer', '').lower()
+    model_text = found.get('modelName', '').lower()
+    friendly_text = found.get('friendlyName') or 'Unknown'
+    desc_text = found.get('modelDescription', '').lower()
+    logger.debug("Parsed: Manufacturer='%s', Model='%s', Friendly='%s', Description='%s'", manuf_text, model_text, friendly_text, desc_text)
+
+    # Robust LG webOS check (case insensitive, check multiple fields)
+    if _is_lg(manuf_text) and ('webos' in model_text or 'webos' in desc_text or 'webos' in friendly_text.lower()):
+        device_info = {
+            'ip': ip,
+            'friendly_name': friendly_text,
+            'model_name': model_text.capitalize() or desc_text.capitalize() or "webOS TV"
+        }
+        logger.info("Matched LG webOS TV: %s", device_info)
+        return device_info
+    logger.debug("Not detected as LG webOS - skipping.")
+    return None
+
+class DescriptionCache:
+    """
+    Device descriptions keyed by USN (or LOCATION when there is none), kept for the
+    CACHE-CONTROL max-age the device announced. Devices that are not LG TVs are
+    remembered too, so speakers and Chromecasts are only looked at once per max-age.
+    An expired entry is revalidated with If-None-Match / If-Modified-Since, and all
+    fetches share one pooled HTTP session. Safe to use from discovery threads.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_DESCRIPTION_PATH, pool_size: int = 16):
+        self.path = path
+        self.pool_size = pool_size
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path:
+                try:
+                    with open(self.path, encoding="utf-8") as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    pass
+        return self._entries
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp_path = f"{self.path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _http(self):
+        if self._session is None:
+            # imported here so code paths that never fetch a description don't pay for requests
+            import requests
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+
+    def fetch(self, location: str, ip: str, usn: Optional[str] = None, max_age: Optional[int] = None) -> Optional[Dict[str, str]]:
+        """Device info for an LG webOS TV at `location`, None for anything else (or on errors)."""
+        key = usn or location
+        max_age = DEFAULT_MAX_AGE if max_age is None else max_age
+        with self._lock:
+            entry = self._load().get(key)
+        if entry and entry["location"] != location:
+            entry = None  # same device on a new address, its old answer says nothing
+        if entry and entry["expires"] > time.time():
+            return self._answer(entry, ip)
+
+        headers = {}
+        if entry and entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry and entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            with self._http().get(location, headers=headers, timeout=5, stream=True) as response:
+                if response.status_code == 304 and entry:
+                    logger.debug("Description at %s not modified", location)
+                    info = entry["info"]
+                else:
+                    response.raise_for_status()
+                    info = parse_description(response.iter_content(chunk_size=1024), ip)
+                    if info:
+                        info['location'] = location
+                        if usn:
+                            info['usn'] = usn
+                entry = {
+                    "location": location,
+                    "info": info,
+                    "expires": time.time() + max_age,
+                    # a 304 may leave the validators out, the old ones still apply then
+                    "etag": response.headers.get("ETag") or headers.get("If-None-Match"),
+                    "last_modified": response.headers.get("Last-Modified") or headers.get("If-Modified-Since"),
+                }
+        except Exception as e:
+            # errors aren't cached, a TV that is still booting gets asked again next time
+            logger.warning("Error fetching/parsing XML from %s: %s", location, e)
+            return None
+        with self._lock:
+            self._load()[key] = entry
+            self._save()
+        return self._answer(entry, ip)
+
+    @staticmethod
+    def _answer(entry: Dict, ip: str) -> Optional[Dict[str, str]]:
+        return {**entry["info"], 'ip': ip} if entry["info"] else None
+
+    def invalidate(self, key: str):
+        """Forget one device (USN or LOCATION), e.g. after it said ssdp:byebye."""
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                self._save()
+
+    def clear(self):
+        """Forget every device (the file too), the next fetch of each downloads it again."""
+        with self._lock:
+            self._entries = {}
+            self._save()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._load())
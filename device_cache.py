@@ -0,0 +1,58 @@
+import json
+import os
+import time
+from typing import Optional, Dict, List
+
+# where the last discovered TVs are remembered between runs (next to the .env)
+DEFAULT_CACHE_PATH = ".lg_tv_cache.json"
+# a TV's IP almost never changes, so a week old entry is still worth trying first
+DEFAULT_TTL = 7 * 24 * 60 * 60
+
+class DeviceCache:
+    """
+    On-disk cache of discovered LG TVs keyed by ip.
+    Every entry keeps the discovery info ('ip', 'friendly_name', 'model_name',
+    'location', 'mac' once known) plus a 'last_seen' unix timestamp used for the TTL.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+
+    def load(self) -> Dict[str, Dict]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            # missing or corrupted cache just means we discover again
+            return {}
+
+    def _write(self, devices: Dict[str, Dict]):
+        # write to a temp file and swap it in so a crash never leaves half a file behind
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(devices, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def fresh_devices(self) -> List[Dict]:
+        """Cached TVs that are still within the TTL, most recently seen first."""
+        now = time.time()
+        devices = [d for d in self.load().values() if now - d.get("last_seen", 0) < self.ttl]
+        return sorted(devices, key=lambda d: d["last_seen"], reverse=True)
+
+    def get(self, ip: str) -> Optional[Dict]:
+        return self.load().get(ip)
+
+    def remember(self, device_info: Dict):
+        """Store (or refresh) a TV after it was discovered or connected to."""
+        devices = self.load()
+        entry = dict(devices.get(device_info["ip"], {}))
+        entry.update(device_info)
+        entry["last_seen"] = time.time()
+        devices[device_info["ip"]] = entry
+        self._write(devices)
+
+    def forget(self, ip: str):
+        devices = self.load()
+        if devices.pop(ip, None) is not None:
+            self._write(devices)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+import socket
+import struct
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import device_cache
+import discover
+
+logger = logging.getLogger(__name__)
+
+# change events passed to on_change listeners
+ONLINE = "online"
+OFFLINE = "offline"
+MOVED = "moved"  # same device (USN), new ip/LOCATION
+
+# announcements worth fetching a description for, everything else only refreshes known devices
+WATCHED_TYPES = {
+    "urn:schemas-upnp-org:device:MediaRenderer:1",
+    "urn:lge-com:service:webos-second-screen:1",
+}
+# bookkeeping that lives in the registry only, not in the device info handed out
+_STATE_FIELDS = ("max_age", "expires", "online", "previous_ip")
+
+def device_info(device: Dict) -> Dict:
+    return {k: v for k, v in device.items() if k not in _STATE_FIELDS}
+
+class _ListenerProtocol(asyncio.DatagramProtocol):
+    def __init__(self, registry: "DeviceRegistry"):
+        self.registry = registry
+
+    def datagram_received(self, data, addr):
+        self.registry._datagram(data, addr[0])
+
+class DeviceRegistry:
+    """
+    Live view of the LG webOS TVs on the network, kept up to date by listening
+    to the NOTIFY ssdp:alive / ssdp:byebye announcements on 239.255.255.250:1900
+    (plus one M-SEARCH at start so TVs that are already on show up right away).
+    Devices are keyed by their USN, so a TV that comes back with a new ip is
+    reported as MOVED instead of as a new device. With a DeviceCache every
+    change is written through, which keeps the console's fast path pointing
+    at the right ip.
+    """
+
+    def __init__(self, cache: Optional[device_cache.DeviceCache] = None, search: bool = True):
+        self.cache = cache
+        self.search = search
+        # USN uuid -> device info + 'usn', 'location', 'max_age', 'expires', 'online'
+        self.devices: Dict[str, Dict] = {}
+        self._fetching: Dict[str, asyncio.Task] = {}
+        self._listeners: List[Callable[[str, Dict], None]] = []
+        self._waiters: List[Tuple[Callable[[Dict], bool], asyncio.Future]] = []
+        self._transport = None
+        self._expiry_task: Optional[asyncio.Task] = None
+
+    # ---- lifecycle ----
+    async def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        # other SSDP listeners on this host (a mock TV, media servers) keep working
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, "SO_REUSEPORT"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind(("", discover.SSDP_PORT))
+        membership = struct.pack("4s4s", socket.inet_aton(discover.MULTICAST_GROUP), socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        loop = asyncio.get_running_loop()
+        self._transport, _ = await loop.create_datagram_endpoint(lambda: _ListenerProtocol(self), sock=sock)
+        if self.search:
+            self._transport.sendto(discover.MSEARCH_MSG, (discover.MULTICAST_GROUP, discover.SSDP_PORT))
+        self._expiry_task = asyncio.create_task(self._expire())
+        logger.info("Listening for SSDP announcements on %s:%d", discover.MULTICAST_GROUP, discover.SSDP_PORT)
+        return self
+
+    async def stop(self):
+        if self._transport:
+            self._transport.close()
+            self._transport = None
+        tasks = [t for t in (self._expiry_task, *self._fetching.values()) if t]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._expiry_task = None
+        self._fetching.clear()
+        for _, future in self._waiters:
+            future.cancel()
+        self._waiters.clear()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ---- queries ----
+    def online_devices(self) -> List[Dict]:
+        """Device info (as discovery returns it, plus 'usn') of every TV currently online."""
+        return [device_info(device) for device in self.devices.values() if device["online"]]
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Device by USN, ip or MAC address, online or not."""
+        if key in self.devices:
+            return self.devices[key]
+        for device in self.devices.values():
+            if key in (device["ip"], device.get("mac")):
+                return device
+        return None
+
+    async def wait_for(self, predicate: Optional[Callable[[Dict], bool]] = None, timeout: float = 10) -> Optional[Dict]:
+        """First online device matching `predicate` (any TV by default), waiting up to `timeout` for one to show up."""
+        predicate = predicate or (lambda device: True)
+        for device in self.online_devices():
+            if predicate(device):
+                return device
+        future = asyncio.get_running_loop().create_future()
+        waiter = (predicate, future)
+        self._waiters.append(waiter)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def on_change(self, callback: Callable[[str, Dict], None]):
+        """Call `callback(event, device)` for every ONLINE, OFFLINE and MOVED transition."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[str, Dict], None]):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _emit(self, event: str, device: Dict):
+        logger.info("%s %s (%s)", device.get("friendly_name", "TV"), event, device["ip"])
+        if self.cache and event != OFFLINE:
+            if event == MOVED:
+                self.cache.forget(device["previous_ip"])
+            self.cache.remember(device_info(device))
+        for callback in self._listeners:
+            try:
+                callback(event, device)
+            except Exception:
+                logger.exception("Registry listener failed")
+        if event != OFFLINE:
+            for predicate, future in list(self._waiters):
+                if not future.done() and predicate(device):
+                    future.set_result(device)
+
+    # ---- announcements ----
+    def _datagram(self, data: bytes, ip: str):
+        start_line, headers = discover.parse_ssdp(data)
+        if start_line.startswith("M-SEARCH"):
+            return
+        usn = headers.get("usn", "").split("::")[0] or headers.get("location")
+        if not usn:
+            return
+        if headers.get("nts") == "ssdp:byebye":
+            device = self.devices.get(usn)
+            if device and device["online"]:
+                device["online"] = False
+                self._emit(OFFLINE, device)
+            return
+
+        # NOTIFY ssdp:alive, or an answer to our M-SEARCH
+        location = headers.get("location")
+        if not location:
+            return
+        max_age = discover.cache_max_age(headers)
+        device = self.devices.get(usn)
+        if device:
+            device["expires"] = time.time() + max_age
+            device["max_age"] = max_age
+            if device["ip"] != ip:
+                device["previous_ip"] = device["ip"]
+                device["ip"], device["location"] = ip, location
+                device["online"] = True
+                self._emit(MOVED, device)
+            elif not device["online"]:
+                device["online"] = True
+                self._emit(ONLINE, device)
+            return
+
+        if (headers.get("nt") or headers.get("st")) not in WATCHED_TYPES:
+            return
+        # speakers and Chromecasts end up as negative entries in discover's description cache
+        if location in self._fetching:
+            return
+        self._fetching[location] = asyncio.ensure_future(self._check(usn, location, ip, max_age))
+
+    async def _check(self, usn: str, location: str, ip: str, max_age: int):
+        try:
+            device_info = await asyncio.to_thread(discover._fetch_description, location, ip, usn, max_age)
+        finally:
+            self._fetching.pop(location, None)
+        if not device_info:
+            return
+        device = self.devices[usn] = {
+            **device_info, "usn": usn, "max_age": max_age, "expires": time.time() + max_age, "online": True,
+        }
+        self._emit(ONLINE, device)
+
+    async def _expire(self):
+        # a TV that was unplugged never says byebye, it just stops re-announcing
+        while True:
+            await asyncio.sleep(1)
+            now = time.time()
+            for device in self.devices.values():
+                if device["online"] and device["expires"] < now:
+                    device["online"] = False
+                    self._emit(OFFLINE, device)
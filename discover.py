@@ -1,37 +1,99 @@
+import asyncio
+import ipaddress
+import logging
+import re
 import socket
 import time
-import requests
-import xml.etree.ElementTree as ET
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, AsyncIterator, Tuple
 
-def discover_lg_tv(timeout: int = 10) -> Optional[Dict[str, str]]:
+import description_cache
+
+logger = logging.getLogger(__name__)
+
+# UPnP devices basically listen on a multicaste ip
+MULTICAST_GROUP = '239.255.255.250'
+# which uses the UDP protocol on port '1900'
+SSDP_PORT = 1900
+# basically a message to search these SSDP over UPnP devices
+MSEARCH_MSG = (
+    'M-SEARCH * HTTP/1.1\r\n'
+    'HOST: 239.255.255.250:1900\r\n'
+    'MAN: "ssdp:discover"\r\n'
+    'MX: 5\r\n'
+    'ST: urn:schemas-upnp-org:device:MediaRenderer:1\r\n'  # LG TVs respond to this MediaRenderer!
+    'USER-AGENT: UDAP/2.0\r\n'  # Required for LG UDAP/UPnP
+    '\r\n'
+).encode('utf-8')
+_MAX_AGE = re.compile(r'max-age\s*=\s*(\d+)', re.IGNORECASE)
+
+# subnet sweep: the ports webOS listens on for ssap (wss and the old plain ws one)
+WEBOS_PORTS = (3001, 3000)
+# how long a host with an open webOS port gets to answer a unicast M-SEARCH (UPnP 1.1 allows it 1 s)
+UNICAST_SEARCH_TIMEOUT = 1.0
+
+# descriptions of every device ever seen, so each one is only downloaded (and parsed) once per max-age
+descriptions = description_cache.DescriptionCache()
+
+def unicast_msearch(ip: str) -> bytes:
     """
-    Discover LG webOS TV on the local network via SSDP/UPnP.
-    Returns a dict with 'ip', 'friendly_name', 'model_name' if found, else None.
+    M-SEARCH sent straight to one host (UPnP 1.1 unicast search). It carries no MX: a
+    device asked directly answers within a second instead of waiting out a random delay.
     """
-    # UPnP devices basically listen on a multicaste ip
-    multicast_group = '239.255.255.250'
-    # which uses the UDP protocol on port '1900'
-    port = 1900
-    # basically a message to search these SSDP over UPnP devices
-    MSEARCH_MSG = (
+    return (
         'M-SEARCH * HTTP/1.1\r\n'
-        'HOST: 239.255.255.250:1900\r\n'
+        f'HOST: {ip}:{SSDP_PORT}\r\n'
         'MAN: "ssdp:discover"\r\n'
-        'MX: 5\r\n'
-        'ST: urn:schemas-upnp-org:device:MediaRenderer:1\r\n'  # LG TVs respond to this MediaRenderer!
-        'USER-AGENT: UDAP/2.0\r\n'  # Required for LG UDAP/UPnP
+        'ST: urn:schemas-upnp-org:device:MediaRenderer:1\r\n'
+        'USER-AGENT: UDAP/2.0\r\n'
         '\r\n'
     ).encode('utf-8')
-    
+
+def parse_ssdp(data: bytes) -> Tuple[str, Dict[str, str]]:
+    """Start line and lower-cased headers of an SSDP datagram (NOTIFY, M-SEARCH or a search response)."""
+    lines = data.decode('utf-8', errors='ignore').split('\r\n')
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    return lines[0], headers
+
+def cache_max_age(headers: Dict[str, str]) -> int:
+    """Seconds the device says its announcement (and description) stay valid."""
+    match = _MAX_AGE.search(headers.get('cache-control', ''))
+    return int(match.group(1)) if match else description_cache.DEFAULT_MAX_AGE
+
+def _fetch_description(location: str, ip: str, usn: Optional[str] = None, max_age: Optional[int] = None) -> Optional[Dict[str, str]]:
+    """Check one device description (cached, see DescriptionCache), errors just mean 'not a TV'."""
+    uuid = usn.split('::')[0] if usn else None
+    device_info = descriptions.fetch(location, ip, uuid, max_age)
+    if device_info and uuid:
+        # what credentials and WebOSClient(uuid=...) know the TV by, even for entries cached before it was kept
+        device_info.setdefault('usn', uuid)
+    if device_info and not device_info.get('mac'):
+        # the SSDP exchange just put the TV in the ARP table, keep its MAC for Wake-on-LAN
+        import wol
+        mac = wol.mac_from_arp(ip)
+        if mac:
+            device_info['mac'] = mac
+    return device_info
+
+def _fetch_for(headers: Dict[str, str], ip: str) -> Optional[Dict[str, str]]:
+    return _fetch_description(headers['location'], ip, headers.get('usn'), cache_max_age(headers))
+
+def discover_lg_tv(timeout: int = 10) -> Optional[Dict[str, str]]:
+    """
+    Discover LG webOS TV on the local network via SSDP/UPnP.
+    Returns a dict with 'ip', 'friendly_name', 'model_name' if found, else None.
+    """
     # Create UDP socket
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
     sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
     sock.settimeout(1)  # Per-loop timeout for control
     
     # Send the M-SEARCH
-    sock.sendto(MSEARCH_MSG, (multicast_group, port))
-    print("Sent M-SEARCH Multicast. Listening for responses...")
+    sock.sendto(MSEARCH_MSG, (MULTICAST_GROUP, SSDP_PORT))
+    logger.info("Sent M-SEARCH Multicast. Listening for responses...")
     
     potential_devices: List[Dict[str, str]] = []
     seen_locations: set = set()  # Deduplicate by location to avoid repeats
@@ -39,73 +101,165 @@ def discover_lg_tv(timeout: int = 10) -> Optional[Dict[str, str]]:
     while time.time() - start_time < timeout:
         try:
             data, addr = sock.recvfrom(1024)
-            response = data.decode('utf-8',errors='ignore')
-            print(f"\nReceived response from {addr}:\n{response}")
+            logger.debug("Received response from %s:\n%s", addr, data.decode('utf-8', errors='ignore'))
             
             # Parse LOCATION from response
-            location = None
-            for line in response.splitlines():
-                if line.lower().startswith('location:'):
-                    location = line.split(':', 1)[1].strip()
-                    break
-            
+            _, headers = parse_ssdp(data)
+            location = headers.get('location')
             if location and location not in seen_locations:
                 seen_locations.add(location)
-                print(f"Location of XML File found: {location}")
-                # Fetch and parse XML
-                try:
-                    # http/get request to the specified location
-                    xml_response = requests.get(location,timeout=5)
-                    xml_response.raise_for_status()
-                    xml_text = xml_response.text
-                    # you may uncomment the below print statement if you would like to see the XML
-                    # print(f"XML content (full):\n{xml_text}")  
-                    
-                    # format the XML so that it's readable as well as iterable
-                    tree = ET.ElementTree(ET.fromstring(xml_text))
-                    root = tree.getroot()
-                    
-                    # Use iter with full namespaced tag to extract reliably
-                    upnp_ns = '{urn:schemas-upnp-org:device-1-0}' 
-                    manuf_text = ''
-                    model_text = ''
-                    friendly_text = 'Unknown'
-                    desc_text = ''
-                    
-                    for el in root.iter():
-                        if el.tag == upnp_ns + 'manufacturer':
-                            manuf_text = (el.text or '').lower().strip()
-                        elif el.tag == upnp_ns + 'modelName':
-                            model_text = (el.text or '').lower().strip()
-                        elif el.tag == upnp_ns + 'friendlyName':
-                            friendly_text = (el.text or 'Unknown').strip()
-                        elif el.tag == upnp_ns + 'modelDescription':
-                            desc_text = (el.text or '').lower().strip()
-                    
-                    print(f"Parsed: Manufacturer='{manuf_text}', Model='{model_text}', Friendly='{friendly_text}', Description='{desc_text}'")
-                    
-                    # Robust LG webOS check (case insensitive, check multiple fields)
-                    if ('lg' in manuf_text or 'lge' in manuf_text) and ('webos' in model_text or 'webos' in desc_text or 'webos' in friendly_text.lower()):
-                        ip = addr[0]
-                        device_info = {
-                            'ip': ip,
-                            'friendly_name': friendly_text,
-                            'model_name': model_text.capitalize() or desc_text.capitalize() or "webOS TV"
-                        }
-                        potential_devices.append(device_info)
-                        print(f"Matched LG webOS TV: {device_info}")
-                    else:
-                        print("Not detected as LG webOS - skipping.")
-                except Exception as e:
-                    print(f"Error fetching/parsing XML from {location}: {e}")
+                logger.debug("Location of XML File found: %s", location)
+                # Fetch and parse XML (or take it from the description cache)
+                device_info = _fetch_for(headers, addr[0])
+                if device_info:
+                    potential_devices.append(device_info)
         except socket.timeout:
             continue  # Loop until timeout,this may result in repeated results
     
     sock.close()
     if potential_devices:
-        print(f"Found {len(potential_devices)} potential LG TVs. Returning first one.")
+        logger.info("Found %d potential LG TVs. Returning first one.", len(potential_devices))
         # returning the first one
         return potential_devices[0]
     else:
-        print("No LG webOS TV found after timeout.")
-        return None
\ No newline at end of file
+        logger.info("No LG webOS TV found after timeout.")
+        return None
+
+class _SSDPProtocol(asyncio.DatagramProtocol):
+    """Pushes every SSDP response datagram onto a queue for the discovery loop."""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+
+    def datagram_received(self, data, addr):
+        self.queue.put_nowait((data, addr))
+
+async def discover_lg_tvs_async(timeout: float = 10) -> AsyncIterator[Dict[str, str]]:
+    """
+    Async SSDP discovery that yields every LG webOS TV as soon as its description is checked.
+    Descriptions are fetched concurrently, so one slow device doesn't hold up the rest.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: _SSDPProtocol(queue), family=socket.AF_INET, proto=socket.IPPROTO_UDP
+    )
+    transport.get_extra_info('socket').setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+    transport.sendto(MSEARCH_MSG, (MULTICAST_GROUP, SSDP_PORT))
+    logger.info("Sent M-SEARCH Multicast. Listening for responses...")
+
+    seen_locations: set = set()
+    fetches: set = set()
+    receiver = asyncio.ensure_future(queue.get())
+    deadline = loop.time() + timeout
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, _ = await asyncio.wait({receiver, *fetches}, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is receiver:
+                    data, addr = task.result()
+                    receiver = asyncio.ensure_future(queue.get())
+                    _, headers = parse_ssdp(data)
+                    location = headers.get('location')
+                    if location and location not in seen_locations:
+                        seen_locations.add(location)
+                        logger.debug("Location of XML File found: %s", location)
+                        fetches.add(asyncio.ensure_future(asyncio.to_thread(_fetch_for, headers, addr[0])))
+                else:
+                    fetches.discard(task)
+                    device_info = task.result()
+                    if device_info:
+                        yield device_info
+    finally:
+        receiver.cancel()
+        for task in fetches:
+            task.cancel()
+        transport.close()
+
+class _UnicastSearch(asyncio.DatagramProtocol):
+    """One socket for all unicast M-SEARCHes of a sweep, answers are matched by source ip."""
+
+    def __init__(self):
+        self.waiting: Dict[str, asyncio.Future] = {}
+
+    def datagram_received(self, data, addr):
+        future = self.waiting.get(addr[0])
+        if future and not future.done():
+            future.set_result(data)
+
+async def _port_open(ip: str, port: int, timeout: float) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+async def sweep_lg_tvs_async(cidr: str, concurrency: int = 128, timeout: float = 0.5) -> AsyncIterator[Dict[str, str]]:
+    """
+    Discovery for networks that filter multicast: probe every host of `cidr` for an open
+    webOS port (at most `concurrency` hosts at a time), ask the ones that have one for their
+    description with a unicast M-SEARCH, and yield each confirmed LG webOS TV as soon as it is.
+    Yields the same device info as discover_lg_tvs_async.
+    """
+    hosts = [str(ip) for ip in ipaddress.ip_network(cidr, strict=False).hosts()]
+    loop = asyncio.get_running_loop()
+    transport, search = await loop.create_datagram_endpoint(_UnicastSearch, family=socket.AF_INET, proto=socket.IPPROTO_UDP)
+    semaphore = asyncio.Semaphore(concurrency)
+    logger.info("Sweeping %d hosts of %s for LG webOS TVs...", len(hosts), cidr)
+
+    async def check(ip: str) -> Optional[Dict[str, str]]:
+        async with semaphore:
+            if not any(await asyncio.gather(*(_port_open(ip, port, timeout) for port in WEBOS_PORTS))):
+                return None
+        future = search.waiting[ip] = loop.create_future()
+        try:
+            # the device answers with the same LOCATION it would multicast
+            transport.sendto(unicast_msearch(ip), (ip, SSDP_PORT))
+            data = await asyncio.wait_for(future, UNICAST_SEARCH_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.debug("%s has a webOS port open but didn't answer the M-SEARCH", ip)
+            return None
+        finally:
+            search.waiting.pop(ip, None)
+        _, headers = parse_ssdp(data)
+        if 'location' not in headers:
+            return None
+        return await asyncio.to_thread(_fetch_for, headers, ip)
+
+    checks = [asyncio.ensure_future(check(ip)) for ip in hosts]
+    try:
+        for next_done in asyncio.as_completed(checks):
+            device_info = await next_done
+            if device_info:
+                yield device_info
+    finally:
+        for task in checks:
+            task.cancel()
+        await asyncio.gather(*checks, return_exceptions=True)
+        transport.close()
+
+async def discover_lg_tv_async(timeout: float = 10, first_match: bool = True, subnet: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """
+    Async version of discover_lg_tv. With first_match it returns as soon as one TV answers
+    instead of always waiting out the whole timeout. With a subnet (e.g. "192.168.1.0/24")
+    the hosts are swept over unicast instead, for networks that drop multicast.
+    """
+    potential_devices: List[Dict[str, str]] = []
+    stream = sweep_lg_tvs_async(subnet) if subnet else discover_lg_tvs_async(timeout)
+    try:
+        async for device_info in stream:
+            potential_devices.append(device_info)
+            if first_match:
+                break
+    finally:
+        await stream.aclose()
+
+    if potential_devices:
+        logger.info("Found %d potential LG TVs. Returning first one.", len(potential_devices))
+        return potential_devices[0]
+    logger.info("No LG webOS TV found after timeout.")
+    return None
@@ -0,0 +1,169 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+import client, discover, device_cache, device_registry, wol
+
+logger = logging.getLogger(__name__)
+
+class Fleet:
+    """
+    Pool of connected WebOSClient instances for a whole floor of LG displays.
+    Any client method can be fanned out to all (or some) of the TVs at once,
+    with at most `concurrency` TVs being talked to at the same time.
+    """
+
+    def __init__(self, concurrency: int = 10, cache: Optional[device_cache.DeviceCache] = None):
+        self.concurrency = concurrency
+        self.cache = cache or device_cache.DeviceCache()
+        self.tvs: Dict[str, Dict] = {}
+        self.clients: Dict[str, client.WebOSClient] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    def add(self, tv_info: Dict):
+        self.tvs[tv_info['ip']] = tv_info
+
+    async def discover(self, timeout: float = 10, subnet: Optional[str] = None) -> List[Dict]:
+        """Add every LG webOS TV that answers SSDP within the timeout (or is found sweeping `subnet`)."""
+        stream = discover.sweep_lg_tvs_async(subnet) if subnet else discover.discover_lg_tvs_async(timeout)
+        found = [tv_info async for tv_info in stream]
+        for tv_info in found:
+            self.add(tv_info)
+            self.cache.remember(tv_info)
+        logger.info("Fleet discovered %d TVs", len(found))
+        return found
+
+    def load_cached(self) -> List[Dict]:
+        """Add every TV from the discovery cache that is still within its TTL."""
+        cached = self.cache.fresh_devices()
+        for tv_info in cached:
+            self.add(tv_info)
+        return cached
+
+    def watch(self, registry: device_registry.DeviceRegistry):
+        """Follow a DeviceRegistry: TVs that come online are added, TVs that moved follow their new ip."""
+        registry.on_change(self._registry_changed)
+
+    def _registry_changed(self, event: str, device: Dict):
+        if event == device_registry.ONLINE:
+            self.tvs.setdefault(device['ip'], device)
+        elif event == device_registry.MOVED:
+            old_ip = device['previous_ip']
+            self.tvs.pop(old_ip, None)
+            self.add(device)
+            # the old session points at an address the TV gave up, connect() picks the new one
+            connector = self.clients.pop(old_ip, None)
+            if connector:
+                asyncio.ensure_future(connector.close())
+
+    async def _run(self, ip: str, coro_factory, timeout: Optional[float] = None):
+        async with self._semaphore:
+            try:
+                if timeout is None:
+                    return await coro_factory()
+                # per TV, so one that hangs costs only its own slot in the results
+                return await asyncio.wait_for(coro_factory(), timeout)
+            except asyncio.TimeoutError:
+                return TimeoutError(f"{ip} did not answer within {timeout}s")
+            except Exception as e:
+                # one broken TV shouldn't take the whole broadcast down with it
+                return e
+
+    async def _gather(self, ips: List[str], coro_factory, timeout: Optional[float] = None) -> Dict[str, object]:
+        results = await asyncio.gather(*(self._run(ip, lambda ip=ip: coro_factory(ip), timeout) for ip in ips))
+        return dict(zip(ips, results))
+
+    def _targets(self, targets: Optional[Iterable[str]]) -> List[str]:
+        return list(targets) if targets is not None else list(self.clients)
+
+    async def connect(self, targets: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Dict[str, object]:
+        """Connect to the given TVs (all known by default); returns ip -> None or the error."""
+        ips = list(targets) if targets is not None else [ip for ip in self.tvs if ip not in self.clients]
+
+        async def connect_one(ip):
+            tv_info = self.tvs.get(ip, {})
+            connector = client.WebOSClient(ip, mac=tv_info.get('mac'), uuid=tv_info.get('usn'))
+            try:
+                await connector.connect()
+            except BaseException:
+                await connector.close()
+                raise
+            self.clients[ip] = connector
+            await self._remember(ip, connector)
+
+        results = await self._gather(ips, connect_one, timeout)
+        connected = sum(1 for r in results.values() if r is None)
+        logger.info("Fleet connected to %d/%d TVs", connected, len(ips))
+        return results
+
+    async def _remember(self, ip: str, connector: client.WebOSClient):
+        tv_info = self.tvs.setdefault(ip, {'ip': ip})
+        if not tv_info.get('mac'):
+            mac = await connector.learn_mac()
+            if mac:
+                tv_info['mac'] = mac
+        self.cache.remember(tv_info)
+
+    async def power_on(self, targets: Optional[Iterable[str]] = None, timeout: float = 60) -> Dict[str, object]:
+        """
+        Wake the given TVs (all known, not yet connected ones by default) with Wake-on-LAN
+        and connect to each as soon as it accepts registration; returns ip -> None or the error.
+        """
+        ips = list(targets) if targets is not None else [ip for ip in self.tvs if ip not in self.clients]
+        cached = self.cache.load()
+
+        async def wake_one(ip):
+            tv_info = {**cached.get(ip, {}), **self.tvs.get(ip, {})}
+            connector = await wol.power_on(ip, tv_info.get('mac'), timeout, uuid=tv_info.get('usn'))
+            self.clients[ip] = connector
+            await self._remember(ip, connector)
+
+        # waking is mostly waiting on the TVs, so all of them boot in parallel instead of
+        # `concurrency` at a time
+        results = await asyncio.gather(*(wake_one(ip) for ip in ips), return_exceptions=True)
+        results = dict(zip(ips, results))
+        logger.info("Fleet woke %d/%d TVs", sum(1 for r in results.values() if r is None), len(ips))
+        return results
+
+    async def broadcast(self, method: str, *args, targets: Optional[Iterable[str]] = None,
+                        timeout: Optional[float] = None, **kwargs) -> Dict[str, object]:
+        """
+        Call `method` on every connected TV (or just `targets`) concurrently.
+        Returns ip -> result, where a failed TV maps to the exception it raised
+        (a TimeoutError for one that took longer than `timeout`).
+        """
+        ips = self._targets(targets)
+        missing = [ip for ip in ips if ip not in self.clients]
+        if missing:
+            raise KeyError(f"Not connected to {missing}")
+        return await self._gather(ips, lambda ip: getattr(self.clients[ip], method)(*args, **kwargs), timeout)
+
+    async def run_scene(self, scene, targets: Optional[Iterable[str]] = None) -> Dict[str, object]:
+        """Run a scenes.Scene on every connected TV (or just `targets`) at once; ip -> step results or the error."""
+        ips = self._targets(targets)
+        missing = [ip for ip in ips if ip not in self.clients]
+        if missing:
+            raise KeyError(f"Not connected to {missing}")
+        return await self._gather(ips, lambda ip: scene.run(self.clients[ip]))
+
+    @staticmethod
+    def failures(results: Dict[str, object]) -> Dict[str, Exception]:
+        """Only the TVs that failed, out of a connect/broadcast result."""
+        return {ip: r for ip, r in results.items() if isinstance(r, Exception)}
+
+    def health(self) -> Dict[str, dict]:
+        """Health of every connected TV, keyed by ip."""
+        return {ip: connector.health_status() for ip, connector in self.clients.items()}
+
+    def __getattr__(self, name):
+        # fleet.set_volume(20) is broadcast("set_volume", 20) for every WebOSClient method
+        if name.startswith('_') or not callable(getattr(client.WebOSClient, name, None)):
+            raise AttributeError(name)
+
+        async def fan_out(*args, targets: Optional[Iterable[str]] = None, **kwargs):
+            return await self.broadcast(name, *args, targets=targets, **kwargs)
+        return fan_out
+
+    async def close(self):
+        await asyncio.gather(*(c.close() for c in self.clients.values()), return_exceptions=True)
+        self.clients.clear()
@@ -0,0 +1,329 @@
+"""
+Long running gateway that keeps one persistent session per TV and shares it with every local consumer.
+
+    python gateway.py --tv 10.0.0.5 --tv 10.0.0.6
+
+HTTP/JSON (default port 8765):
+    GET  /tvs                               -> TVs and whether they are connected
+    GET  /tv/<ip>/<method>?volume=20        -> call a WebOSClient method with keyword arguments
+    POST /tv/<ip>/<method>  {"args": [...], "kwargs": {...}}
+
+WebSocket (default port 8766), one JSON message per call:
+    {"id": 1, "tv": "10.0.0.5", "method": "get_volume"}          -> {"id": 1, "result": {...}}
+    {"id": 2, "tv": "10.0.0.5", "subscribe": "volume"}           -> {"id": 2, "result": "subscribed"}
+                                                                    then {"event": "volume", "tv": ..., "payload": {...}}
+    {"id": 3, "tv": "10.0.0.5", "unsubscribe": "volume"}
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+import websockets
+
+import client
+import device_registry
+import fleet
+
+logger = logging.getLogger(__name__)
+
+# names a consumer can subscribe to, anything else must be a full ssap:// uri
+SUBSCRIPTIONS = {
+    "volume": "ssap://audio/getVolume",
+    "foreground_app": "ssap://com.webos.applicationManager/getForegroundAppInfo",
+    "power_state": "ssap://com.webos.service.tvpower/power/getPowerState",
+    "current_channel": "ssap://tv/getCurrentChannel",
+}
+
+# session management stays with the gateway, consumers can't close the shared connection
+PRIVATE_METHODS = {"connect", "close", "save_client_key", "connect_input", "disconnect_input", "subscribe",
+                   "app_index", "channel_catalog"}
+
+def _is_private(method: str) -> bool:
+    # subscribe_* hand back a live Subscription, consumers get those through listen() instead
+    return method.startswith(("_", "subscribe")) or method in PRIVATE_METHODS
+
+def _is_read(method: str) -> bool:
+    return method.startswith(("get_", "list_"))
+
+def _error_status(error: Exception) -> int:
+    if isinstance(error, PermissionError):
+        return 403
+    if isinstance(error, (KeyError, ValueError, TypeError, AttributeError)):
+        return 400
+    if isinstance(error, TimeoutError):
+        return 504
+    if isinstance(error, ConnectionError):
+        return 502
+    return 500
+
+class Gateway:
+    """
+    Holds one WebOSClient per TV (through a Fleet) and exposes its methods over
+    HTTP/JSON and WebSocket. Identical read calls that overlap share one TV round
+    trip, and every TV subscription is opened once and fanned out to all listeners.
+    """
+
+    def __init__(self, tvs: Iterable[str] = (), host: str = "127.0.0.1", http_port: int = 8765, ws_port: int = 8766):
+        self.host = host
+        self.http_port = http_port
+        self.ws_port = ws_port
+        self.fleet = fleet.Fleet()
+        for ip in tvs:
+            self.fleet.add({"ip": ip})
+        # TVs switched on later (or moved to a new ip) show up without a rescan
+        self.registry = device_registry.DeviceRegistry(cache=self.fleet.cache)
+        self.fleet.watch(self.registry)
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        # (ip, uri) -> the TV subscription and the websockets listening to it
+        self._subscriptions: Dict[Tuple[str, str], client.Subscription] = {}
+        self._listeners: Dict[Tuple[str, str], Set] = {}
+        # one lock per TV (connecting) and per (ip, uri) (subscribing), so consumers arriving
+        # together share one client and one TV subscription instead of racing to open their own
+        self._locks: Dict[Tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._http_server = None
+        self._ws_server = None
+
+    # ---- lifecycle ----
+    async def start(self):
+        if not self.fleet.tvs:
+            self.fleet.load_cached()
+        try:
+            await self.registry.start()
+        except OSError as e:
+            logger.warning("Not listening for SSDP announcements: %r", e)
+        results = await self.fleet.connect()
+        for ip, error in self.fleet.failures(results).items():
+            logger.warning("Could not connect to %s yet: %r", ip, error)
+        self._http_server = await asyncio.start_server(self._handle_http, self.host, self.http_port)
+        self._ws_server = await websockets.serve(self._handle_ws, self.host, self.ws_port)
+        logger.info("Gateway on http://%s:%d and ws://%s:%d for %d TV(s)",
+                    self.host, self.http_port, self.host, self.ws_port, len(self.fleet.tvs))
+        return self
+
+    async def stop(self):
+        for server in (self._http_server, self._ws_server):
+            if server:
+                server.close()
+                await server.wait_closed()
+        await self.registry.stop()
+        await self.fleet.close()
+
+    # ---- calls ----
+    async def _client_for(self, ip: str) -> client.WebOSClient:
+        connector = self.fleet.clients.get(ip)
+        if connector is not None:
+            return connector
+        async with self._locks[("connect", ip)]:
+            connector = self.fleet.clients.get(ip)
+            if connector is None:
+                if ip not in self.fleet.tvs:
+                    raise KeyError(f"Unknown TV {ip}")
+                results = await self.fleet.connect([ip])
+                if results[ip] is not None:
+                    raise ConnectionError(f"TV {ip} is not reachable: {results[ip]}")
+                connector = self.fleet.clients[ip]
+        return connector
+
+    async def call(self, ip: str, method: str, args: list = (), kwargs: Optional[dict] = None):
+        """Run one WebOSClient method on a TV; overlapping identical reads share the call."""
+        if _is_private(method) or not callable(getattr(client.WebOSClient, method, None)):
+            raise AttributeError(f"Unknown method {method}")
+        kwargs = kwargs or {}
+        connector = await self._client_for(ip)
+        if not asyncio.iscoroutinefunction(getattr(client.WebOSClient, method)):
+            # plain accessors like health_status answer locally, there is nothing to await
+            result = getattr(connector, method)(*args, **kwargs)
+            return await result if inspect.isawaitable(result) else result
+        if not _is_read(method):
+            return await getattr(connector, method)(*args, **kwargs)
+
+        key = (ip, method, json.dumps([list(args), kwargs], sort_keys=True))
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(getattr(connector, method)(*args, **kwargs))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def listen(self, ip: str, name: str, ws):
+        """Add a websocket to the listeners of a TV subscription, opening it on the TV if needed."""
+        uri = SUBSCRIPTIONS.get(name, name)
+        if not uri.startswith("ssap://"):
+            raise ValueError(f"Unknown subscription {name}")
+        key = (ip, uri)
+        async with self._locks[key]:
+            self._listeners.setdefault(key, set()).add((ws, name))
+            if key not in self._subscriptions:
+                connector = await self._client_for(ip)
+                self._subscriptions[key] = await connector.subscribe(
+                    uri, callback=lambda payload: self._fan_out(key, payload)
+                )
+
+    async def unlisten(self, ip: str, name: str, ws):
+        uri = SUBSCRIPTIONS.get(name, name)
+        key = (ip, uri)
+        async with self._locks[key]:
+            listeners = self._listeners.get(key, set())
+            listeners.discard((ws, name))
+            if not listeners:
+                # last one out closes the TV subscription
+                self._listeners.pop(key, None)
+                subscription = self._subscriptions.pop(key, None)
+                if subscription:
+                    await subscription.unsubscribe()
+
+    def _fan_out(self, key: Tuple[str, str], payload: dict):
+        for ws, name in list(self._listeners.get(key, ())):
+            message = json.dumps({"event": name, "tv": key[0], "payload": payload})
+            asyncio.ensure_future(self._send_quietly(ws, message))
+
+    @staticmethod
+    async def _send_quietly(ws, message: str):
+        try:
+            await ws.send(message)
+        except websockets.ConnectionClosed:
+            pass
+
+    def status(self) -> dict:
+        health = self.fleet.health()
+        return {ip: {**info, "connected": ip in self.fleet.clients, "health": health.get(ip)}
+                for ip, info in self.fleet.tvs.items()}
+
+    # ---- websocket api ----
+    async def _handle_ws(self, ws):
+        subscribed = set()
+        try:
+            async for raw in ws:
+                asyncio.ensure_future(self._answer_ws(ws, raw, subscribed))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for ip, name in subscribed:
+                await self.unlisten(ip, name, ws)
+
+    async def _answer_ws(self, ws, raw: str, subscribed: set):
+        msg_id = None
+        try:
+            msg = json.loads(raw)
+            msg_id = msg.get("id")
+            ip = msg.get("tv")
+            if "subscribe" in msg:
+                await self.listen(ip, msg["subscribe"], ws)
+                subscribed.add((ip, msg["subscribe"]))
+                reply = {"id": msg_id, "result": "subscribed"}
+            elif "unsubscribe" in msg:
+                await self.unlisten(ip, msg["unsubscribe"], ws)
+                subscribed.discard((ip, msg["unsubscribe"]))
+                reply = {"id": msg_id, "result": "unsubscribed"}
+            elif msg.get("method") == "status":
+                reply = {"id": msg_id, "result": self.status()}
+            else:
+                result = await self.call(ip, msg["method"], msg.get("args", []), msg.get("kwargs"))
+                reply = {"id": msg_id, "result": result}
+        except Exception as e:
+            reply = {"id": msg_id, "error": str(e), "status": _error_status(e)}
+        try:
+            message = json.dumps(reply)
+        except (TypeError, ValueError) as e:
+            message = json.dumps({"id": msg_id, "error": f"Result is not JSON serializable: {e}", "status": 500})
+        await self._send_quietly(ws, message)
+
+    # ---- http api ----
+    async def _handle_http(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_http_request(reader)
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # garbage request line or headers: answer, then hang up, the stream is out of step
+                    await self._write_http(writer, 400, json.dumps({"error": f"Bad request: {e}"}).encode(), False)
+                    break
+                if request is None:
+                    break
+                method, path, query, body, keep_alive = request
+                status, result = await self._route_http(method, path, query, body)
+                try:
+                    payload = json.dumps(result).encode()
+                except (TypeError, ValueError) as e:
+                    status, payload = 500, json.dumps({"error": f"Result is not JSON serializable: {e}"}).encode()
+                await self._write_http(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _write_http(writer, status: int, payload: bytes, keep_alive: bool):
+        writer.write(
+            f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+
+    @staticmethod
+    async def _read_http_request(reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, version = lines[0].split(" ", 2)
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+        return method.upper(), unquote(url.path), dict(parse_qsl(url.query)), body, keep_alive
+
+    async def _route_http(self, method: str, path: str, query: dict, body: bytes):
+        parts = [p for p in path.split("/") if p]
+        try:
+            if parts == ["tvs"]:
+                return 200, self.status()
+            if len(parts) != 3 or parts[0] != "tv":
+                return 404, {"error": f"No route for {path}"}
+            _, ip, name = parts
+            args, kwargs = [], {}
+            if method == "POST" and body:
+                data = json.loads(body)
+                args, kwargs = data.get("args", []), data.get("kwargs", {})
+            else:
+                # query strings are text, numbers are turned back into numbers
+                kwargs = {key: json.loads(value) if value.lstrip("-").isdigit() or value in ("true", "false") else value
+                          for key, value in query.items()}
+            return 200, {"result": await self.call(ip, name, args, kwargs)}
+        except Exception as e:
+            return _error_status(e), {"error": str(e)}
+
+async def _serve(args):
+    gateway = Gateway(args.tv, args.host, args.http_port, args.ws_port)
+    await gateway.start()
+    try:
+        await asyncio.Future()
+    finally:
+        await gateway.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Share one persistent session per LG TV over local HTTP/WebSocket.")
+    parser.add_argument("--tv", action="append", default=[], help="TV ip (repeatable, default: cached TVs)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8765)
+    parser.add_argument("--ws-port", type=int, default=8766)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+CONNECTING = "connecting"
+HEALTHY = "healthy"
+DEGRADED = "degraded"
+UNHEALTHY = "unhealthy"
+CLOSED = "closed"
+
+class HealthMonitor:
+    """
+    Heartbeat for one WebOSClient's main socket.
+    Any frame from the TV counts as proof of life, so a ping only goes out after
+    `interval` seconds of silence (`min_interval` while the link looks degraded).
+    The pong must come back within a timeout derived from the rolling RTT; if it
+    doesn't the socket is torn down at once, which fails in-flight commands
+    straight away and lets the client's reconnect take over.
+    """
+
+    def __init__(self, client, interval: float = 3.0, min_interval: float = 1.0,
+                 min_timeout: float = 1.0, max_timeout: float = 3.0):
+        self.client = client
+        self.interval = interval
+        self.min_interval = min_interval
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.state = CLOSED
+        self.srtt: Optional[float] = None  # smoothed round trip, seconds
+        self.rttvar: Optional[float] = None
+        self.last_seen = 0.0
+        self.failures = 0
+        self._task: Optional[asyncio.Task] = None
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    def on_change(self, callback: Callable[[str, str], None]):
+        """Call `callback(old_state, new_state)` on every health transition."""
+        self._listeners.append(callback)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+        old, self.state = self.state, state
+        logger.info("%s health: %s -> %s", self.client.tv_ip, old, state)
+        for callback in self._listeners:
+            try:
+                callback(old, state)
+            except Exception:
+                logger.exception("Health listener failed")
+
+    def frame_received(self):
+        self.last_seen = time.monotonic()
+
+    def timeout(self) -> float:
+        if self.srtt is None:
+            return self.max_timeout
+        return min(self.max_timeout, max(self.min_timeout, self.srtt + 4 * self.rttvar))
+
+    def _record_rtt(self, rtt: float):
+        # same smoothing as TCP's retransmission timer (RFC 6298)
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+            return
+        slow = rtt > self.srtt + 4 * self.rttvar
+        self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+        self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self._set_state(DEGRADED if slow else HEALTHY)
+
+    def connecting(self):
+        self._set_state(CONNECTING)
+
+    def start(self):
+        """Begin watching the client's current socket (called once it is registered)."""
+        self.stop()
+        self.last_seen = time.monotonic()
+        self._set_state(HEALTHY)
+        self._task = asyncio.create_task(self._run(self.client.ws))
+
+    def stop(self, state: Optional[str] = None):
+        if self._task and self._task is not asyncio.current_task():
+            self._task.cancel()
+        self._task = None
+        if state:
+            self._set_state(state)
+
+    async def _run(self, ws):
+        while True:
+            interval = self.min_interval if self.state == DEGRADED else self.interval
+            idle = time.monotonic() - self.last_seen
+            if idle < interval:
+                await asyncio.sleep(interval - idle)
+                continue
+            started = time.monotonic()
+            try:
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, self.timeout())
+            except (asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+                self.failures += 1
+                logger.warning("%s missed a heartbeat (%r), dropping the connection", self.client.tv_ip, e)
+                self._set_state(UNHEALTHY)
+                # no close handshake with a TV that stopped answering, just cut it
+                ws.transport.abort()
+                return
+            self._record_rtt(time.monotonic() - started)
+            self.last_seen = time.monotonic()
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "rtt_ms": None if self.srtt is None else round(self.srtt * 1000, 2),
+            "idle_s": round(time.monotonic() - self.last_seen, 2) if self.last_seen else None,
+            "failures": self.failures,
+        }
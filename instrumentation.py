@@ -0,0 +1,86 @@
+import logging
+from collections import defaultdict, deque
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# the events a hook can be registered for
+EVENTS = ("send", "receive", "error", "input_send")
+
+def _percentile(sorted_samples: List[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))
+    return sorted_samples[index]
+
+class Metrics:
+    """
+    Per-uri counters, error counts and round-trip latencies for one WebOSClient,
+    plus hook callbacks fired around every send/receive on the main and input sockets.
+    Latencies keep the last `window` samples per uri, enough for stable p50/p95/p99.
+    """
+
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.requests: Dict[str, int] = defaultdict(int)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.input_frames = 0
+        self._latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=self.window))
+        self._hooks: Dict[str, List[Callable]] = {event: [] for event in EVENTS}
+
+    def add_hook(self, event: str, callback: Callable[[str, dict], None]):
+        """Call `callback(event, info)` whenever `event` happens (one of EVENTS)."""
+        if event not in self._hooks:
+            raise ValueError(f"Unknown event {event!r}, expected one of {EVENTS}")
+        self._hooks[event].append(callback)
+
+    def remove_hook(self, event: str, callback: Callable[[str, dict], None]):
+        self._hooks[event].remove(callback)
+
+    def emit(self, event: str, **info):
+        for callback in self._hooks[event]:
+            try:
+                callback(event, info)
+            except Exception:
+                # a broken hook must never break the command it is watching
+                logger.exception("Metrics hook for %s failed", event)
+
+    def record_send(self, uri: str):
+        self.requests[uri] += 1
+
+    def record_latency(self, uri: str, seconds: float):
+        self._latencies[uri].append(seconds)
+
+    def record_error(self, uri: str):
+        self.errors[uri] += 1
+
+    def record_input(self):
+        self.input_frames += 1
+
+    def latency(self, uri: str = None) -> Dict[str, float]:
+        """p50/p95/p99/max round-trip in milliseconds for one uri, or across all of them."""
+        if uri is None:
+            samples = [s for window in self._latencies.values() for s in window]
+        else:
+            samples = list(self._latencies.get(uri, ()))
+        if not samples:
+            return {}
+        samples.sort()
+        return {
+            "count": len(samples),
+            "p50": _percentile(samples, 0.50) * 1000,
+            "p95": _percentile(samples, 0.95) * 1000,
+            "p99": _percentile(samples, 0.99) * 1000,
+            "max": samples[-1] * 1000,
+        }
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Everything collected so far, keyed by uri."""
+        return {
+            uri: {"requests": count, "errors": self.errors.get(uri, 0), "latency_ms": self.latency(uri)}
+            for uri, count in self.requests.items()
+        }
+
+    def reset(self):
+        self.requests.clear()
+        self.errors.clear()
+        self._latencies.clear()
+        self.input_frames = 0
@@ -0,0 +1,192 @@
+"""
+One-shot command line for the LG webOS remote, for cron jobs and home automation hooks.
+
+    python lgremote.py volume set 20 --tv 10.0.0.5
+    python lgremote.py app launch netflix
+    python lgremote.py button HOME RIGHT RIGHT ENTER
+    python lgremote.py scene movie_night.yaml
+    python lgremote.py power on --tv 10.0.0.5 --mac a8:23:fe:01:02:03
+
+It connects, runs a single command, prints the TV's answer as JSON and exits.
+Heavy modules (websockets, discovery, settings) are only imported once they are needed.
+"""
+import argparse
+import sys
+
+# group -> action -> (WebOSClient method, converters for the positional arguments)
+COMMANDS = {
+    "volume": {
+        "get": ("get_volume",),
+        "set": ("set_volume", int),
+        "up": ("volume_up",),
+        "down": ("volume_down",),
+        "status": ("get_audio_status",),
+    },
+    "mute": {
+        "get": ("get_mute",),
+        "on": ("set_mute", lambda: True),
+        "off": ("set_mute", lambda: False),
+    },
+    "app": {
+        "list": ("list_apps",),
+        "launch-points": ("list_launch_points",),
+        "current": ("get_foreground_app",),
+        "launch": ("launch_app", str),
+    },
+    "channel": {
+        "list": ("get_channel_list",),
+        "current": ("get_current_channel",),
+        "open": ("open_channel", str),
+        "up": ("channel_up",),
+        "down": ("channel_down",),
+    },
+    "input": {
+        "list": ("get_external_inputs",),
+        "switch": ("switch_input", str),
+    },
+    "media": {
+        "play": ("media_play",),
+        "pause": ("media_pause",),
+        "stop": ("media_stop",),
+        "rewind": ("media_rewind",),
+        "ff": ("media_fast_forward",),
+    },
+    "power": {
+        # wakes the TV with Wake-on-LAN first, see _wake
+        "on": ("get_power_state",),
+        "off": ("power_off",),
+        "state": ("get_power_state",),
+        "screen-off": ("turn_off_screen",),
+        "screen-on": ("turn_on_screen",),
+    },
+    "system": {
+        "info": ("get_system_info",),
+    },
+}
+
+def _add_connection_options(parser, defaults=True):
+    # the sub-commands get them too (without defaults) so "volume set 20 --tv 10.0.0.5" works
+    default = (lambda value: value) if defaults else (lambda value: argparse.SUPPRESS)
+    parser.add_argument("--tv", default=default(None), help="TV ip address (default: last known TV, else SSDP discovery)")
+    parser.add_argument("--subnet", default=default(None), help="without --tv, sweep this CIDR (e.g. 192.168.1.0/24) instead of SSDP multicast")
+    parser.add_argument("--key", default=default(None), help="client-key to register with (default: the stored key for the TV, else CLIENT_KEY from the environment/.env)")
+    parser.add_argument("--timeout", type=float, default=default(10.0), help="seconds to wait for the TV's answer")
+    parser.add_argument("-v", "--verbose", action="count", default=default(0), help="log progress to stderr (-vv for debug)")
+    parser.add_argument("--log-payloads", action="store_true", default=default(False), help="dump every TV response to the debug log")
+    parser.add_argument("--record", metavar="FILE", default=default(None), help="append every frame to a recording (.jsonl or .jsonl.gz), see recorder.py")
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="lgremote", description="Run one command on an LG webOS TV and exit.")
+    _add_connection_options(parser)
+    common = argparse.ArgumentParser(add_help=False)
+    _add_connection_options(common, defaults=False)
+    groups = parser.add_subparsers(dest="group", required=True)
+
+    for group, actions in COMMANDS.items():
+        group_parser = groups.add_parser(group)
+        action_parsers = group_parser.add_subparsers(dest="action", required=True)
+        for action, (method, *converters) in actions.items():
+            action_parser = action_parsers.add_parser(action, help=method, parents=[common])
+            for index, convert in enumerate(converters):
+                if convert in (int, str):
+                    action_parser.add_argument(f"arg{index}", type=convert)
+            if (group, action) == ("power", "on"):
+                action_parser.add_argument("--mac", help="TV MAC address (default: the one remembered for the TV)")
+
+    button_parser = groups.add_parser("button", help="press remote buttons on the input socket", parents=[common])
+    button_parser.add_argument("buttons", nargs="+", help="e.g. HOME RIGHT*6 DOWN ENTER")
+
+    scene_parser = groups.add_parser("scene", help="run a scene file (.json, .yaml)", parents=[common])
+    scene_parser.add_argument("path")
+    return parser
+
+def _recorder(args):
+    if not args.record:
+        return None
+    import recorder
+    return recorder.Recorder(args.record, tv=args.tv)
+
+async def _connect(args):
+    import client
+
+    if args.tv:
+        # without --key the client finds this TV's own key in the credential store
+        connector = client.WebOSClient(args.tv, client_key=args.key, command_timeout=args.timeout, auto_reconnect=False,
+                                       log_payloads=args.log_payloads, recorder=_recorder(args))
+        await connector.connect()
+        return connector
+
+    # no ip given: same cached fast path / discovery fallback as the console
+    import main as console
+    tv_info, connector = await console.connect_to_tv(subnet=args.subnet)
+    if connector is None:
+        raise ConnectionError("No LG TV found. Check network/TV is on or pass --tv")
+    connector.command_timeout = args.timeout
+    connector.auto_reconnect = False
+    connector.log_payloads = args.log_payloads
+    # already registered here, the recording starts with the first command
+    connector.recorder = _recorder(args)
+    return connector
+
+async def _wake(args):
+    import device_cache
+    import wol
+
+    cache = device_cache.DeviceCache()
+    tv_info = cache.get(args.tv) if args.tv else next(iter(cache.fresh_devices()), None)
+    if tv_info is None and not args.tv:
+        raise ConnectionError("No known TV to wake, pass --tv and --mac")
+    ip = args.tv or tv_info["ip"]
+    mac = args.mac or (tv_info or {}).get("mac")
+    return await wol.power_on(ip, mac, timeout=max(args.timeout, 60), client_key=args.key, command_timeout=args.timeout,
+                              auto_reconnect=False, log_payloads=args.log_payloads, recorder=_recorder(args))
+
+async def run(args):
+    scene = None
+    if args.group == "scene":
+        # a broken scene file fails before we even talk to the TV
+        import scenes
+        scene = scenes.Scene.load(args.path)
+
+    if (args.group, getattr(args, "action", None)) == ("power", "on"):
+        connector = await _wake(args)
+    else:
+        connector = await _connect(args)
+    try:
+        if args.group == "button":
+            return await connector.play_macro(args.buttons)
+        if scene is not None:
+            results = await scene.run(connector)
+            return {step_id: str(result) if isinstance(result, Exception) else result for step_id, result in results.items()}
+
+        method, *converters = COMMANDS[args.group][args.action]
+        call_args = []
+        for index, convert in enumerate(converters):
+            call_args.append(getattr(args, f"arg{index}") if convert in (int, str) else convert())
+        return await getattr(connector, method)(*call_args)
+    finally:
+        await connector.close()
+        if connector.recorder is not None:
+            connector.recorder.close()
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    import asyncio
+    import json
+    import logging
+
+    level = {0: logging.WARNING, 1: logging.INFO}.get(args.verbose, logging.DEBUG)
+    logging.basicConfig(level=level, format="%(levelname)s %(name)s: %(message)s")
+
+    try:
+        result = asyncio.run(run(args))
+    except Exception as e:
+        print(f"lgremote: {e}", file=sys.stderr)
+        return 1
+    if result is not None:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+from typing import List, Sequence, Tuple, Union
+
+# one step of a macro: "HOME", "RIGHT*6", ("RIGHT", 6), ("move", dx, dy), ("scroll", dx, dy) or "click"
+Step = Union[str, Tuple]
+
+def button_frame(name: str) -> str:
+    return f"type:button\nname:{name}\n\n"
+
+def move_frame(dx: int, dy: int, down: bool = False) -> str:
+    return f"type:move\ndx:{dx}\ndy:{dy}\ndown:{int(down)}\n\n"
+
+def scroll_frame(dx: int, dy: int) -> str:
+    return f"type:scroll\ndx:{dx}\ndy:{dy}\n\n"
+
+def click_frame() -> str:
+    return "type:click\n\n"
+
+def _normalize(step: Step) -> Tuple:
+    """Turn any accepted step spelling into (kind, *args)."""
+    if isinstance(step, str):
+        step = step.strip()
+        if step.lower() == "click":
+            return ("click",)
+        name, _, count = step.partition("*")
+        return ("button", name.strip().upper(), int(count) if count else 1)
+    kind = str(step[0]).lower()
+    if kind in ("move", "scroll"):
+        return (kind, int(step[1]), int(step[2]))
+    if kind == "click":
+        return ("click",)
+    return ("button", str(step[0]).upper(), int(step[1]) if len(step) > 1 else 1)
+
+def compile_steps(steps: Sequence[Step]) -> List[str]:
+    """
+    Compile a key/pointer sequence into ready to send input socket frames.
+    Repeat counts are expanded and back to back pointer moves (or scrolls) are
+    merged into a single frame, since the TV only cares about the total offset.
+    """
+    frames: List[str] = []
+    pending = None  # (kind, dx, dy) of a move/scroll still being accumulated
+
+    def flush():
+        nonlocal pending
+        if pending:
+            kind, dx, dy = pending
+            frames.append(move_frame(dx, dy) if kind == "move" else scroll_frame(dx, dy))
+            pending = None
+
+    for step in steps:
+        kind, *args = _normalize(step)
+        if kind in ("move", "scroll"):
+            if pending and pending[0] == kind:
+                pending = (kind, pending[1] + args[0], pending[2] + args[1])
+            else:
+                flush()
+                pending = (kind, args[0], args[1])
+            continue
+        flush()
+        if kind == "click":
+            frames.append(click_frame())
+        else:
+            name, count = args
+            frames.extend([button_frame(name)] * count)
+    flush()
+    return frames
+
+class Macro:
+    """
+    A named key/pointer sequence compiled once into input socket frames,
+    so replaying it is just writing strings to WebOSClient.input_ws.
+    """
+
+    def __init__(self, name: str, steps: Sequence[Step], pacing: float = 0.05):
+        self.name = name
+        self.steps = list(steps)
+        self.pacing = pacing  # seconds between frames, the TV drops keys that arrive too fast
+        self.frames = compile_steps(self.steps)
+
+    @classmethod
+    def parse(cls, name: str, text: str, pacing: float = 0.05) -> "Macro":
+        """Build a macro from a comma separated spec like "HOME, RIGHT*6, DOWN, ENTER"."""
+        return cls(name, [part for part in text.split(",") if part.strip()], pacing)
+
+    def __repr__(self):
+        return f"Macro({self.name!r}, {len(self.frames)} frames)"
@@ -1,8 +1,9 @@
 import asyncio
-import discover, client
+import logging
+import discover, client, device_cache, terminal
 
-tv_info = discover.discover_lg_tv()
-print(f"Here is the Tv Info - {tv_info}")
+# how long a cached TV gets to accept the connection before we fall back to SSDP
+CACHED_CONNECT_TIMEOUT = 2
 
 # Define menu categories and their methods
 MENU = {
@@ -28,7 +29,7 @@ MENU = {
             "4": ("Launch Netflix", "launch_netflix"),
             "5": ("Launch YouTube", "launch_youtube"),
             "6": ("Launch Prime Video", "launch_prime_video"),
-            "7": ("Launch JioHotstar", lambda conn: conn.launch_app("jiohunterhotstar")),
+            "7": ("Launch JioHotstar", "launch_jio_hotstar"),
             "8": ("Launch Custom App", "launch_app_prompt"),
         }
     },
@@ -46,6 +47,7 @@ MENU = {
             "9": ("Press OK/Enter", "cursor_click"),
             "10": ("Go Back (in app)", "cursor_back"),
             "11": ("Go Home", "go_home"),
+            "12": ("Open Channel", "open_channel_prompt"),
         }
     },
     "4": {
@@ -70,6 +72,14 @@ MENU = {
     },
 }
 
+# remote mode: keys that become input socket buttons (sent in order, no reply to wait for)
+REMOTE_BUTTONS = {
+    "UP": "UP", "DOWN": "DOWN", "LEFT": "LEFT", "RIGHT": "RIGHT",
+    "ENTER": "ENTER", "BACKSPACE": "BACK", "h": "HOME", "H": "HOME",
+}
+# remote mode: keys that become commands, these wait for the TV's answer so they run in the background
+REMOTE_COMMANDS = {"+": "volume_up", "=": "volume_up", "-": "volume_down"}
+
 def display_main_menu():
     """Display main menu categories"""
     print("\n" + "="*50)
@@ -77,6 +87,7 @@ def display_main_menu():
     print("="*50)
     for key, category in MENU.items():
         print(f"{key}. {category['name']}")
+    print("R. 🎮 Remote Mode (arrow keys)")
     print("0. Exit")
     print("="*50)
 
@@ -110,13 +121,16 @@ async def execute_method(connector, category_key, method_key):
     try:
         # Handle prompt-based methods
         if method == "set_volume_prompt":
-            volume = input("Enter volume (0-100): ")
+            volume = await terminal.ainput("Enter volume (0-100): ")
             result = await connector.set_volume(int(volume))
         elif method == "launch_app_prompt":
-            app_id = input("Enter app ID: ")
+            app_id = await terminal.ainput("Enter app name or ID (e.g., YouTube, netflix): ")
             result = await connector.launch_app(app_id)
+        elif method == "open_channel_prompt":
+            channel = await terminal.ainput("Enter channel number or name (e.g., 205, 5-1, BBC One): ")
+            result = await connector.open_channel(channel)
         elif method == "switch_input_prompt":
-            input_id = input("Enter input ID (e.g., HDMI1, AV1): ")
+            input_id = await terminal.ainput("Enter input ID (e.g., HDMI1, AV1): ")
             result = await connector.switch_input(input_id)
         # Handle callable (lambda) methods
         elif callable(method):
@@ -137,30 +151,105 @@ async def console_menu(connector):
     """Main console menu loop"""
     while True:
         display_main_menu()
-        category_choice = input("Select category (0 to exit): ").strip()
+        category_choice = (await terminal.ainput("Select category (0 to exit): ")).strip()
         
         if category_choice == "0":
             break
+        if category_choice.lower() == "r":
+            await remote_mode(connector)
+            continue
         
         category = display_category_menu(category_choice)
         if not category:
             continue
         
-        method_choice = input("Select method (0 to go back): ").strip()
+        method_choice = (await terminal.ainput("Select method (0 to go back): ")).strip()
         
         if method_choice == "0":
             continue
         
         await execute_method(connector, category_choice, method_choice)
 
+async def remote_mode(connector):
+    """Drive the TV straight from the keyboard: every key press goes out as it happens."""
+    print("\n🎮 Remote mode: arrows move, Enter = OK, Backspace = Back, H = Home, +/- = volume, Esc or Q to leave")
+    # open the input socket now so the first key press doesn't pay for it
+    await connector.connect_input()
+    background = set()
+
+    def report(task):
+        background.discard(task)
+        if not task.cancelled() and task.exception():
+            print(f"❌ Error: {task.exception()}")
+
+    async with terminal.RawKeys() as keys:
+        while True:
+            key = await keys.get()
+            if key in ("ESC", "q", "Q"):
+                break
+            if key in REMOTE_BUTTONS:
+                try:
+                    await connector._send_input_button(REMOTE_BUTTONS[key])
+                except Exception as e:
+                    print(f"❌ Error: {e}")
+            elif key in REMOTE_COMMANDS:
+                task = asyncio.create_task(getattr(connector, REMOTE_COMMANDS[key])())
+                background.add(task)
+                task.add_done_callback(report)
+    await asyncio.gather(*background, return_exceptions=True)
+    print("Left remote mode.")
+
+async def remember_tv(cache, tv_info, connector):
+    """Cache the TV we just registered with, learning its MAC (for Wake-on-LAN) the first time."""
+    if not tv_info.get('mac'):
+        mac = await connector.learn_mac()
+        if mac:
+            tv_info['mac'] = mac
+    cache.remember(tv_info)
+
+async def connect_to_tv(cache=None, registry=None, subnet=None):
+    """
+    Connect straight to the last known TV and only fall back to SSDP discovery
+    when the cached entry is stale or the TV doesn't answer there anymore.
+    TVs a running device_registry.DeviceRegistry has seen online are tried first.
+    On networks that drop multicast, pass a subnet (e.g. "192.168.1.0/24") to sweep instead.
+    Returns (tv_info, connected client) or (None, None).
+    """
+    cache = cache or device_cache.DeviceCache()
+    candidates = (registry.online_devices() if registry else []) + cache.fresh_devices()
+    tried = set()
+    for tv_info in candidates:
+        if tv_info['ip'] in tried:
+            continue
+        tried.add(tv_info['ip'])
+        connector = client.WebOSClient(tv_info['ip'], mac=tv_info.get('mac'), uuid=tv_info.get('usn'))
+        try:
+            await connector.connect(open_timeout=CACHED_CONNECT_TIMEOUT)
+        except PermissionError:
+            raise
+        except Exception as e:
+            print(f"Cached TV at {tv_info['ip']} not reachable ({e!r}), trying discovery...")
+            await connector.close()
+            continue
+        await remember_tv(cache, tv_info, connector)
+        return tv_info, connector
+
+    # returns as soon as the first TV answers instead of waiting out the whole timeout
+    tv_info = await discover.discover_lg_tv_async(subnet=subnet)
+    print(f"Here is the Tv Info - {tv_info}")
+    if not tv_info:
+        return None, None
+    connector = client.WebOSClient(tv_info['ip'], mac=tv_info.get('mac'), uuid=tv_info.get('usn'))
+    await connector.connect()
+    await remember_tv(cache, tv_info, connector)
+    return tv_info, connector
+
 async def main():
+    tv_info, connector = await connect_to_tv()
     if tv_info:
-        print(f"✅ Found TV at {tv_info['ip']}: {tv_info['friendly_name']}")
-        tv_ip = tv_info.get('ip')
-        connector = client.WebOSClient(f"{tv_ip}")
-        
         try:
-            await connector.connect()
+            # TVs a Fleet or the gateway connected to by ip are cached without a name
+            print(f"✅ Found TV at {tv_info['ip']}: {tv_info.get('friendly_name', 'LG webOS TV')}")
             print("Connected! Starting console menu...\n")
             await console_menu(connector)
         finally:
@@ -168,4 +257,7 @@ async def main():
     else:
         print("❌ No LG TV found. Check network/TV is on.")
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    # INFO keeps the connection progress visible like the old prints did
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,377 @@
+"""
+Local stand-in for an LG webOS TV, so WebOSClient can be tested and benchmarked without one on the LAN.
+
+    python mock_tv.py --latency 0.02 --jitter 0.01 --error-rate 0.01 --ssdp
+
+It speaks the ssap register/request/subscribe protocol on wss://<host>:3001 with a self-signed
+certificate, serves the pointer input socket, and can answer SSDP M-SEARCH with a device description.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import ssl
+import struct
+import subprocess
+import tempfile
+from typing import Dict, List, Optional, Set
+
+import websockets
+
+import discover
+
+logger = logging.getLogger(__name__)
+
+INPUT_SOCKET_PATH = "/resources/mock/netinput.pointer.sock"
+
+DESCRIPTION_XML = """<?xml version="1.0"?>
+<root xmlns="urn:schemas-upnp-org:device-1-0">
+  <device>
+    <deviceType>urn:schemas-upnp-org:device:MediaRenderer:1</deviceType>
+    <friendlyName>{friendly_name}</friendlyName>
+    <manufacturer>LG Electronics</manufacturer>
+    <modelDescription>webOS TV (mock)</modelDescription>
+    <modelName>webOS TV MOCK</modelName>
+    <UDN>uuid:{uuid}</UDN>
+  </device>
+</root>
+"""
+
+def generate_self_signed_cert(directory: str) -> tuple:
+    """Create a throwaway certificate/key pair with the openssl command line tool."""
+    cert_path = os.path.join(directory, "mock_tv_cert.pem")
+    key_path = os.path.join(directory, "mock_tv_key.pem")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "30",
+             "-subj", "/CN=webos-mock", "-keyout", key_path, "-out", cert_path],
+            check=True, capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise RuntimeError("Could not generate a self-signed certificate with openssl, pass cert/key paths instead") from e
+    return cert_path, key_path
+
+class MockTV:
+    """
+    A fake webOS TV. Every request is answered after `latency` +/- `jitter` seconds,
+    and `error_rate` of them (0..1) come back as ssap errors instead.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 3001, latency: float = 0.0, jitter: float = 0.0,
+                 error_rate: float = 0.0, client_key: str = "mock-client-key", friendly_name: str = "Mock webOS TV",
+                 cert: Optional[str] = None, key: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.client_key = client_key
+        self.friendly_name = friendly_name
+        self.cert = cert
+        self.key = key
+        self.state = {
+            "volume": 15,
+            "mute": False,
+            "power": "Active",
+            "foreground_app": "com.webos.app.home",
+            "channel": {"channelId": "1_1_1_0_0_0", "channelNumber": "1", "channelName": "Mock One"},
+            "input": "HDMI_1",
+        }
+        self.requests: Dict[str, int] = {}
+        self.input_frames: List[str] = []
+        # (websocket, subscription id) -> uri for every live subscribe
+        self._subscriptions: Dict[tuple, str] = {}
+        self._server = None
+        self._http_server = None
+        self._ssdp_transport = None
+        self._ssdp = None
+        self._tmpdir = None
+        self._connections: Set = set()
+
+    # ---- lifecycle ----
+    async def start(self, ssdp: bool = False, http_port: int = 0):
+        if not (self.cert and self.key):
+            self._tmpdir = tempfile.TemporaryDirectory()
+            self.cert, self.key = generate_self_signed_cert(self._tmpdir.name)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(self.cert, self.key)
+        self._server = await websockets.serve(self._handle, self.host, self.port, ssl=ssl_context)
+        logger.info("Mock TV listening on wss://%s:%d", self.host, self.port)
+        if ssdp:
+            await self.start_ssdp(http_port)
+        return self
+
+    async def start_ssdp(self, http_port: int = 0):
+        """Serve the device description over HTTP and answer M-SEARCH like a real TV."""
+        self._http_server = await asyncio.start_server(self._handle_http, self.host, http_port)
+        http_port = self._http_server.sockets[0].getsockname()[1]
+        location = f"http://{self.host}:{http_port}/description.xml"
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", discover.SSDP_PORT))
+        membership = struct.pack("4s4s", socket.inet_aton(discover.MULTICAST_GROUP), socket.inet_aton("0.0.0.0"))
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        # answers go out from the TV's own address, that's the ip discovery reports
+        reply_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        reply_sock.bind((self.host, 0))
+        loop = asyncio.get_running_loop()
+        self._ssdp_transport, self._ssdp = await loop.create_datagram_endpoint(
+            lambda: _SSDPResponder(location, f"uuid:mock-{self.port}", reply_sock), sock=sock
+        )
+        # like a TV that was just switched on, tell passive listeners we are here
+        self._ssdp.notify("ssdp:alive")
+        logger.info("Mock TV answering SSDP, description at %s", location)
+
+    async def stop(self):
+        if self._ssdp_transport:
+            self._ssdp.notify("ssdp:byebye")
+            self._ssdp_transport.close()
+        if self._http_server:
+            self._http_server.close()
+            await self._http_server.wait_closed()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._tmpdir:
+            self._tmpdir.cleanup()
+
+    async def drop_connections(self):
+        """Close every ssap connection, like a TV going to standby, to exercise reconnects."""
+        for ws in list(self._connections):
+            await ws.close()
+
+    def hang(self, hung: bool = True):
+        """Stop reading from every client (pings included), like a TV that vanished without closing TCP."""
+        for ws in self._connections:
+            if hung:
+                ws.transport.pause_reading()
+            else:
+                ws.transport.resume_reading()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.stop()
+
+    # ---- protocol ----
+    async def _delay(self):
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _handle(self, ws):
+        if ws.request.path == INPUT_SOCKET_PATH:
+            await self._handle_input(ws)
+            return
+        self._connections.add(ws)
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                if msg.get("type") == "register":
+                    await self._delay()
+                    await ws.send(json.dumps({"type": "registered", "id": msg.get("id"),
+                                              "payload": {"client-key": self.client_key}}))
+                elif msg.get("type") == "unsubscribe":
+                    self._subscriptions.pop((ws, msg.get("id")), None)
+                else:
+                    # answer out of order like the real TV may, so the client can't rely on ordering
+                    asyncio.ensure_future(self._answer(ws, msg))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._connections.discard(ws)
+            for sub_key in [k for k in self._subscriptions if k[0] is ws]:
+                del self._subscriptions[sub_key]
+
+    async def _answer(self, ws, msg):
+        uri = msg.get("uri", "")
+        self.requests[uri] = self.requests.get(uri, 0) + 1
+        await self._delay()
+        if random.random() < self.error_rate:
+            reply = {"type": "error", "id": msg.get("id"), "error": "500 Injected mock error"}
+        else:
+            reply = {"type": "response", "id": msg.get("id"), "payload": self._payload_for(uri, msg.get("payload") or {})}
+            if msg.get("type") == "subscribe":
+                self._subscriptions[(ws, msg.get("id"))] = uri
+        try:
+            await ws.send(json.dumps(reply))
+        except websockets.ConnectionClosed:
+            pass
+
+    def _payload_for(self, uri: str, payload: dict) -> dict:
+        state = self.state
+        changed = None
+        if uri == "ssap://audio/getVolume":
+            result = {"volume": state["volume"], "muted": state["mute"]}
+        elif uri == "ssap://audio/setVolume":
+            state["volume"] = int(payload.get("volume", state["volume"]))
+            result, changed = {}, "ssap://audio/getVolume"
+        elif uri in ("ssap://audio/volumeUp", "ssap://audio/volumeDown"):
+            state["volume"] = max(0, min(100, state["volume"] + (1 if uri.endswith("Up") else -1)))
+            result, changed = {}, "ssap://audio/getVolume"
+        elif uri == "ssap://audio/getMute":
+            result = {"mute": state["mute"]}
+        elif uri == "ssap://audio/setMute":
+            state["mute"] = bool(payload.get("mute"))
+            result, changed = {}, "ssap://audio/getVolume"
+        elif uri == "ssap://com.webos.applicationManager/getForegroundAppInfo":
+            result = {"appId": state["foreground_app"]}
+        elif uri == "ssap://system.launcher/launch":
+            state["foreground_app"] = payload.get("id", state["foreground_app"])
+            result, changed = {"id": state["foreground_app"]}, "ssap://com.webos.applicationManager/getForegroundAppInfo"
+        elif uri in ("ssap://com.webos.applicationManager/listApps", "ssap://com.webos.applicationManager/listLaunchPoints"):
+            apps = [{"id": app_id, "title": title} for app_id, title in MOCK_APPS]
+            result = {"apps": apps} if uri.endswith("listApps") else {"launchPoints": [dict(a, launchPointId=a["id"]) for a in apps]}
+        elif uri == "ssap://tv/getChannelList":
+            result = {"channelList": MOCK_CHANNELS}
+        elif uri == "ssap://tv/getCurrentChannel":
+            result = dict(state["channel"])
+        elif uri == "ssap://tv/openChannel":
+            match = next((c for c in MOCK_CHANNELS if c["channelId"] == payload.get("channelId")), None)
+            if match:
+                state["channel"] = {k: match[k] for k in ("channelId", "channelNumber", "channelName")}
+            result, changed = {}, "ssap://tv/getCurrentChannel"
+        elif uri == "ssap://tv/getExternalInputList":
+            result = {"devices": [{"id": f"HDMI_{n}", "label": f"HDMI{n}", "connected": state["input"] == f"HDMI_{n}"} for n in (1, 2, 3)]}
+        elif uri == "ssap://tv/switchInput":
+            state["input"] = payload.get("inputId", state["input"])
+            result = {}
+        elif uri == "ssap://com.webos.service.tvpower/power/getPowerState":
+            result = {"state": state["power"]}
+        elif uri == "ssap://system/turnOff":
+            state["power"] = "Suspend"
+            result, changed = {}, "ssap://com.webos.service.tvpower/power/getPowerState"
+        elif uri == "ssap://system/getSystemInfo":
+            result = {"modelName": "MOCK55", "features": {}, "receiverType": "mock"}
+        elif uri == "ssap://com.webos.service.connectionmanager/getinfo":
+            result = {"wiredInfo": {"macAddress": "a8:23:fe:00:00:01"}, "wifiInfo": {"macAddress": "a8:23:fe:00:00:02"}}
+        elif uri == "ssap://com.webos.service.networkinput/getPointerInputSocket":
+            result = {"socketPath": f"wss://{self.host}:{self.port}{INPUT_SOCKET_PATH}"}
+        else:
+            result = {}
+        result["returnValue"] = True
+        if changed:
+            asyncio.ensure_future(self._notify(changed))
+        return result
+
+    async def _notify(self, uri: str):
+        """Push the new state to everyone subscribed to `uri`."""
+        for (ws, sub_id), sub_uri in list(self._subscriptions.items()):
+            if sub_uri != uri:
+                continue
+            event = {"type": "response", "id": sub_id, "payload": self._payload_for(uri, {})}
+            try:
+                await ws.send(json.dumps(event))
+            except websockets.ConnectionClosed:
+                pass
+
+    async def _handle_input(self, ws):
+        try:
+            async for frame in ws:
+                self.input_frames.append(frame)
+        except websockets.ConnectionClosed:
+            pass
+
+    async def _handle_http(self, reader, writer):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+            self.requests["description"] = self.requests.get("description", 0) + 1
+            etag = f'"mock-{self.port}"'
+            if f"if-none-match: {etag}".encode() in head.lower():
+                writer.write(f"HTTP/1.1 304 Not Modified\r\nETag: {etag}\r\nConnection: close\r\n\r\n".encode())
+            else:
+                body = DESCRIPTION_XML.format(friendly_name=self.friendly_name, uuid=f"mock-{self.port}").encode()
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/xml\r\nConnection: close\r\n"
+                             + f"ETag: {etag}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+class _SSDPResponder(asyncio.DatagramProtocol):
+    def __init__(self, location: str, usn: str, reply_sock: socket.socket):
+        self.location = location
+        self.usn = usn
+        self.reply_sock = reply_sock
+
+    def datagram_received(self, data, addr):
+        if not data.startswith(b"M-SEARCH"):
+            return
+        reply = (
+            "HTTP/1.1 200 OK\r\n"
+            "CACHE-CONTROL: max-age=1800\r\n"
+            f"LOCATION: {self.location}\r\n"
+            "ST: urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+            f"USN: {self.usn}::urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+            "SERVER: WebOS/4.1.0 UPnP/1.0\r\n"
+            "\r\n"
+        ).encode()
+        self.reply_sock.sendto(reply, addr)
+
+    def notify(self, nts: str):
+        """Multicast an unsolicited ssdp:alive / ssdp:byebye announcement."""
+        message = (
+            "NOTIFY * HTTP/1.1\r\n"
+            f"HOST: {discover.MULTICAST_GROUP}:{discover.SSDP_PORT}\r\n"
+            "CACHE-CONTROL: max-age=1800\r\n"
+            f"LOCATION: {self.location}\r\n"
+            "NT: urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+            f"NTS: {nts}\r\n"
+            f"USN: {self.usn}::urn:schemas-upnp-org:device:MediaRenderer:1\r\n"
+            "SERVER: WebOS/4.1.0 UPnP/1.0\r\n"
+            "\r\n"
+        ).encode()
+        self.reply_sock.sendto(message, (discover.MULTICAST_GROUP, discover.SSDP_PORT))
+
+    def connection_lost(self, exc):
+        self.reply_sock.close()
+
+MOCK_APPS = [
+    ("netflix", "Netflix"),
+    ("youtube.leanback.v4", "YouTube"),
+    ("amazon", "Prime Video"),
+    ("jiohotstar", "JioHotstar"),
+    ("com.webos.app.browser", "Web Browser"),
+    ("com.webos.app.livetv", "Live TV"),
+]
+
+MOCK_CHANNELS = [
+    {
+        "channelId": f"1_{n}_{n}_0_0_0",
+        "channelNumber": str(n),
+        "majorNumber": n,
+        "minorNumber": 0,
+        "channelName": f"Mock {n}",
+    }
+    for n in range(1, 201)
+]
+
+async def _serve(args):
+    tv = MockTV(args.host, args.port, args.latency, args.jitter, args.error_rate, cert=args.cert, key=args.key)
+    await tv.start(ssdp=args.ssdp)
+    try:
+        await asyncio.Future()
+    finally:
+        await tv.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake LG webOS TV for tests and benchmarks.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every answer")
+    parser.add_argument("--jitter", type=float, default=0.0, help="+/- random seconds on top of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--ssdp", action="store_true", help="also answer SSDP discovery")
+    parser.add_argument("--cert", help="TLS certificate (default: a generated self-signed one)")
+    parser.add_argument("--key", help="TLS private key")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
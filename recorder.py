@@ -0,0 +1,231 @@
+"""
+Record-and-replay of the raw frames a WebOSClient exchanges with its TV.
+
+Record (JSON Lines, gzip compressed when the name ends in .gz):
+    connector = WebOSClient(ip, recorder=Recorder("session.jsonl.gz"))
+    python lgremote.py volume up --record session.jsonl.gz
+
+Replay the client side against a TV (or a mock), at 10x the original pace:
+    python recorder.py replay session.jsonl.gz --tv 10.0.0.5 --speed 10
+
+Stand in for the TV, answering with the recorded responses and timings:
+    python recorder.py serve session.jsonl.gz --port 3001
+
+Every line is {"t": seconds since the start, "ch": "main"|"input", "dir": "out"|"in", "data": raw frame},
+after a header line {"format": "lg-remote-recording", "version": 1, "tv": ..., "started": unix time}.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import logging
+import re
+import time
+from collections import defaultdict, deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import mock_tv
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "lg-remote-recording"
+VERSION = 1
+# the pairing key has no business in a log that gets passed around
+_CLIENT_KEY = re.compile(r'("client-key"\s*:\s*")[^"]*(")')
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class Recorder:
+    """
+    Append-only log of every frame on a client's main and input sockets.
+    Lines are buffered and flushed every `flush_every` frames (and on flush/close),
+    so recording stays cheap next to the socket writes it is watching.
+    """
+
+    def __init__(self, path: str, tv: Optional[str] = None, redact: bool = True, flush_every: int = 64):
+        self.path = path
+        self.tv = tv
+        self.redact = redact
+        self.flush_every = flush_every
+        self.frames = 0
+        self._file = None
+        self._started = None
+
+    def record(self, channel: str, direction: str, frame):
+        if self._file is None:
+            self._file = _open(self.path, "a")
+            self._started = time.perf_counter()
+            header = {"format": FORMAT, "version": VERSION, "tv": self.tv, "started": time.time()}
+            self._file.write(json.dumps(header) + "\n")
+        if isinstance(frame, bytes):
+            frame = frame.decode("utf-8", errors="replace")
+        if self.redact and "client-key" in frame:
+            frame = _CLIENT_KEY.sub(r"\1<redacted>\2", frame)
+        line = {"t": round(time.perf_counter() - self._started, 6), "ch": channel, "dir": direction, "data": frame}
+        self._file.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self.frames += 1
+        if self.frames % self.flush_every == 0:
+            self._file.flush()
+
+    def flush(self):
+        if self._file:
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+def load(path: str) -> Tuple[dict, List[dict]]:
+    """Header and frames of a recording; a session appended later starts its own clock again."""
+    header, frames, offset, last, session = {}, [], 0.0, 0.0, -1
+    with _open(path, "r") as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get("format") == FORMAT:
+                header = header or entry
+                # keep appended sessions after each other on one timeline
+                offset = last
+                session += 1
+                continue
+            entry["t"] += offset
+            entry["session"] = session
+            last = entry["t"]
+            frames.append(entry)
+    return header, frames
+
+def _messages(frames: List[dict], direction: str) -> Iterator[Tuple[float, tuple, dict]]:
+    """(time, (session, message id), message) of every main socket frame in one direction."""
+    for frame in frames:
+        if frame["ch"] == "main" and frame["dir"] == direction:
+            msg = json.loads(frame["data"])
+            yield frame["t"], (frame["session"], msg.get("id")), msg
+
+async def replay(path: str, connector, speed: float = 1.0) -> Dict[str, dict]:
+    """
+    Re-issue the client side of a recording on a connected WebOSClient, keeping the
+    original gaps between frames (divided by `speed`). Requests overlap like they did
+    in the recording; returns the client's metrics snapshot afterwards.
+    """
+    _, frames = load(path)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    tasks, subscriptions = [], []
+    for frame in frames:
+        if frame["dir"] != "out":
+            continue
+        delay = started + frame["t"] / speed - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if frame["ch"] == "input":
+            # buttons and pointer moves keep their exact order
+            await connector._send_input_frame(frame["data"])
+            continue
+        msg = json.loads(frame["data"])
+        if msg.get("type") == "request":
+            tasks.append(asyncio.ensure_future(connector.send_command(msg["uri"], msg.get("payload"))))
+        elif msg.get("type") == "subscribe":
+            tasks.append(asyncio.ensure_future(connector.subscribe(msg["uri"], msg.get("payload"))))
+        # register/unsubscribe belong to the recorded session, ours has its own
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    for result in results:
+        if hasattr(result, "unsubscribe"):
+            subscriptions.append(result)
+    await asyncio.gather(*(s.unsubscribe() for s in subscriptions), return_exceptions=True)
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    logger.info("Replayed %d requests (%d failed) from %s", len(tasks), failed, path)
+    return connector.metrics.snapshot()
+
+def _key(msg: dict) -> Tuple[str, str, str]:
+    return msg.get("type", ""), msg.get("uri", ""), json.dumps(msg.get("payload") or {}, sort_keys=True)
+
+class ReplayTV(mock_tv.MockTV):
+    """
+    A MockTV that answers with what the real TV answered in a recording: same
+    payloads, same response times (divided by `speed`) and, for subscriptions,
+    the same pushed events at the same offsets. Requests the recording never saw
+    fall back to the mock's own simulated state.
+    """
+
+    def __init__(self, path: str, host: str = "127.0.0.1", port: int = 3001, speed: float = 1.0, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.speed = speed
+        # request key -> queue of answers, each a list of (delay after the request, recorded frame)
+        self._answers: Dict[Tuple, deque] = defaultdict(deque)
+        self._load(path)
+
+    def _load(self, path: str):
+        _, frames = load(path)
+        sent = {}
+        answers = defaultdict(list)
+        # ids restart with every session in the file, so they are only unique per session
+        for t, msg_id, msg in _messages(frames, "out"):
+            sent[msg_id] = (t, msg)
+        for t, msg_id, msg in _messages(frames, "in"):
+            if msg_id in sent:
+                answers[msg_id].append((t - sent[msg_id][0], msg))
+        for msg_id, (_, msg) in sent.items():
+            if msg.get("type") in ("request", "subscribe") and answers.get(msg_id):
+                self._answers[_key(msg)].append(answers[msg_id])
+        logger.info("Loaded %d recorded answers from %s", sum(len(q) for q in self._answers.values()), path)
+
+    async def _answer(self, ws, msg):
+        queue = self._answers.get(_key(msg))
+        if not queue:
+            return await super()._answer(ws, msg)
+        recorded = queue[0]
+        # the same request asked again gets the next recorded answer, round robin
+        queue.rotate(-1)
+        uri = msg.get("uri", "")
+        self.requests[uri] = self.requests.get(uri, 0) + 1
+        started = asyncio.get_running_loop().time()
+        for delay, frame in recorded:
+            wait = started + delay / self.speed - asyncio.get_running_loop().time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            frame = dict(frame, id=msg.get("id"))
+            payload = frame.get("payload")
+            if isinstance(payload, dict) and "socketPath" in payload:
+                # the recorded path points at the real TV, keep the client on us
+                frame["payload"] = dict(payload, socketPath=f"wss://{self.host}:{self.port}{mock_tv.INPUT_SOCKET_PATH}")
+            try:
+                await ws.send(json.dumps(frame))
+            except Exception:
+                return
+
+async def _replay_cli(args):
+    import client
+    connector = client.WebOSClient(args.tv, client_key=args.key, auto_reconnect=False)
+    await connector.connect()
+    try:
+        snapshot = await replay(args.path, connector, args.speed)
+    finally:
+        await connector.close()
+    print(json.dumps(snapshot, indent=2))
+
+async def _serve_cli(args):
+    async with ReplayTV(args.path, args.host, args.port, args.speed):
+        await asyncio.Future()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded LG TV sessions.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay_parser = commands.add_parser("replay", help="re-send the client side of a recording to a TV")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument("--tv", default="127.0.0.1")
+    replay_parser.add_argument("--key", default=None, help="client-key (default: the stored one for the TV)")
+    replay_parser.add_argument("--speed", type=float, default=1.0, help="2 = twice as fast as recorded")
+    serve_parser = commands.add_parser("serve", help="stand in for the recorded TV")
+    serve_parser.add_argument("path")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=3001)
+    serve_parser.add_argument("--speed", type=float, default=1.0)
+    cli_args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    try:
+        asyncio.run(_replay_cli(cli_args) if cli_args.command == "replay" else _serve_cli(cli_args))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+class ResponseCache:
+    """
+    Per-uri TTL cache for read-only ssap responses.
+    Entries are evicted least-recently-used once `max_entries` is reached, and
+    concurrent callers asking for the same uncached uri share one request to the TV.
+    """
+
+    def __init__(self, ttls: Optional[Dict[str, float]] = None, default_ttl: float = 300, max_entries: int = 64):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, response)
+        self._inflight: Dict[tuple, asyncio.Future] = {}
+        # bumped on every invalidation so a response that was in flight meanwhile isn't stored
+        self._generation = 0
+
+    @staticmethod
+    def _key(uri: str, payload: Optional[dict]) -> tuple:
+        return (uri, json.dumps(payload or {}, sort_keys=True))
+
+    def get(self, uri: str, payload: Optional[dict] = None):
+        """The cached response if it is still fresh, else None."""
+        key = self._key(uri, payload)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, uri: str, payload: Optional[dict], response):
+        key = self._key(uri, payload)
+        ttl = self.ttls.get(uri, self.default_ttl)
+        self._entries[key] = (time.monotonic() + ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def fetch(self, uri: str, payload: Optional[dict], fetch: Callable[[], Awaitable]):
+        """Return the cached response or run `fetch()` once for everyone currently asking."""
+        cached = self.get(uri, payload)
+        if cached is not None:
+            return cached
+
+        key = self._key(uri, payload)
+        task = self._inflight.get(key)
+        if task is None:
+            generation = self._generation
+            task = asyncio.ensure_future(fetch())
+            self._inflight[key] = task
+
+            def store(done):
+                self._inflight.pop(key, None)
+                if done.cancelled() or done.exception() is not None:
+                    return
+                # errors come back as None from send_command, those are never cached
+                if done.result() is not None and generation == self._generation:
+                    self.put(uri, payload, done.result())
+            task.add_done_callback(store)
+        # one impatient caller being cancelled must not cancel the request for the others
+        return await asyncio.shield(task)
+
+    def invalidate(self, *uris: str):
+        """Drop the cached responses for the given uris, or everything when called without any."""
+        self._generation += 1
+        if not uris:
+            self._entries.clear()
+            return
+        for key in [k for k in self._entries if k[0] in uris]:
+            del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,203 @@
+"""
+Declarative scenes: a set of WebOSClient calls and input macros with the
+dependencies between them, run as a graph so independent steps go out together.
+
+    name: movie night
+    steps:
+      - id: screen
+        call: turn_on_screen
+        when: {power_state: "Screen Off"}
+      - id: input
+        call: switch_input
+        args: [HDMI_2]
+      - id: volume
+        call: set_volume
+        args: [25]
+      - id: app
+        call: launch_app
+        args: [netflix]
+        after: [input]
+        retries: 2
+        timeout: 15
+      - id: profile
+        macro: [DOWN, ENTER]
+        after: [app]
+        unless: {foreground_app: netflix}
+
+Here screen, input and volume are sent at once, app waits for input and the
+profile macro waits for app. JSON files with the same shape work too.
+"""
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+
+import client
+
+logger = logging.getLogger(__name__)
+
+# result of a step whose condition didn't hold
+SKIPPED = "skipped"
+
+class SceneError(Exception):
+    """A scene step that failed, or never ran because a step it depends on failed."""
+
+class Step:
+    __slots__ = ("id", "call", "args", "kwargs", "macro", "pacing", "after", "when", "unless", "retries", "timeout")
+
+    def __init__(self, id: str, call: Optional[str] = None, args: list = (), kwargs: Optional[dict] = None,
+                 macro: Optional[list] = None, pacing: Optional[float] = None, after: list = (),
+                 when: Optional[dict] = None, unless: Optional[dict] = None, retries: int = 0,
+                 timeout: Optional[float] = None):
+        self.id = id
+        self.call = call
+        self.args = list(args)
+        self.kwargs = kwargs or {}
+        self.macro = macro
+        self.pacing = pacing
+        self.after = [after] if isinstance(after, str) else list(after)
+        self.when = when
+        self.unless = unless
+        self.retries = retries
+        self.timeout = timeout
+
+    @classmethod
+    def from_dict(cls, data: dict, index: int) -> "Step":
+        data = dict(data)
+        if ("call" in data) == ("macro" in data):
+            raise ValueError(f"Scene step {index} needs exactly one of 'call' or 'macro'")
+        data.setdefault("id", f"{data.get('call') or 'macro'}_{index}")
+        try:
+            return cls(**data)
+        except TypeError as e:
+            raise ValueError(f"Scene step {data['id']}: {e}") from None
+
+class Scene:
+    """
+    A named graph of steps. Every step starts as soon as the steps listed in its
+    `after` are done, optionally skipped by a `when`/`unless` condition on the
+    TV's power state or foreground app, and retried `retries` times on failure.
+    """
+
+    def __init__(self, name: str, steps: List[Step]):
+        self.name = name
+        self.steps = {}
+        for step in steps:
+            if step.id in self.steps:
+                raise ValueError(f"Duplicate scene step id {step.id}")
+            self.steps[step.id] = step
+        self._validate()
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Scene":
+        return cls(data.get("name", "scene"), [Step.from_dict(step, i) for i, step in enumerate(data.get("steps", []))])
+
+    @classmethod
+    def load(cls, path: str) -> "Scene":
+        """Read a scene from a .json, .yaml or .yml file (YAML needs PyYAML)."""
+        with open(path, encoding="utf-8") as f:
+            if path.endswith((".yaml", ".yml")):
+                # only scenes written in YAML need the extra dependency
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("YAML scenes need PyYAML (pip install pyyaml), or write the scene as JSON") from None
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+        return cls.from_dict(data)
+
+    def _validate(self):
+        for step in self.steps.values():
+            if step.call and (step.call.startswith("_") or not callable(getattr(client.WebOSClient, step.call, None))):
+                raise ValueError(f"Scene step {step.id}: unknown method {step.call}")
+            for dependency in step.after:
+                if dependency not in self.steps:
+                    raise ValueError(f"Scene step {step.id} depends on unknown step {dependency}")
+        # Kahn's algorithm, whatever can't be ordered is part of a cycle
+        waiting = {step_id: len(step.after) for step_id, step in self.steps.items()}
+        ready = [step_id for step_id, count in waiting.items() if count == 0]
+        while ready:
+            done = ready.pop()
+            for step in self.steps.values():
+                if done in step.after:
+                    waiting[step.id] -= 1
+                    if waiting[step.id] == 0:
+                        ready.append(step.id)
+        cyclic = [step_id for step_id, count in waiting.items() if count > 0]
+        if cyclic:
+            raise ValueError(f"Scene steps {cyclic} depend on each other in a cycle")
+
+    async def run(self, connector: client.WebOSClient) -> Dict[str, object]:
+        """
+        Run the scene on one connected TV. Returns step id -> result, where a
+        skipped step maps to SKIPPED and a failed one to its SceneError.
+        """
+        futures = {step_id: asyncio.get_running_loop().create_future() for step_id in self.steps}
+        # every macro shares the one input socket, interleaved frames would scramble both
+        input_lock = asyncio.Lock()
+
+        async def run_step(step: Step):
+            for dependency in step.after:
+                result = await asyncio.shield(futures[dependency])
+                if isinstance(result, SceneError):
+                    return SceneError(f"{step.id} not run, {dependency} failed")
+            try:
+                if not await self._condition_holds(connector, step):
+                    logger.debug("Scene %s: skipping %s", self.name, step.id)
+                    return SKIPPED
+                return await self._execute(connector, step, input_lock)
+            except Exception as e:
+                return SceneError(f"{step.id} failed: {e!r}")
+
+        async def settle(step: Step):
+            futures[step.id].set_result(await run_step(step))
+
+        await asyncio.gather(*(settle(step) for step in self.steps.values()))
+        results = {step_id: future.result() for step_id, future in futures.items()}
+        failed = [step_id for step_id, result in results.items() if isinstance(result, SceneError)]
+        if failed:
+            logger.warning("Scene %s on %s: %d step(s) failed: %s", self.name, connector.tv_ip, len(failed), failed)
+        return results
+
+    async def _execute(self, connector: client.WebOSClient, step: Step, input_lock: asyncio.Lock):
+        for attempt in range(step.retries + 1):
+            try:
+                if step.macro is not None:
+                    async with input_lock:
+                        return await asyncio.wait_for(connector.play_macro(step.macro, step.pacing), step.timeout)
+                return await asyncio.wait_for(getattr(connector, step.call)(*step.args, **step.kwargs), step.timeout)
+            except (TimeoutError, ConnectionError) as e:
+                if attempt == step.retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                logger.info("Scene %s: %s failed (%r), retrying in %.1fs", self.name, step.id, e, delay)
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    async def _condition_holds(connector: client.WebOSClient, step: Step) -> bool:
+        if step.when and not await _matches(connector, step.when):
+            return False
+        if step.unless and await _matches(connector, step.unless):
+            return False
+        return True
+
+def _as_list(value) -> list:
+    return value if isinstance(value, list) else [value]
+
+async def _matches(connector: client.WebOSClient, condition: dict) -> bool:
+    """True if every key of the condition holds right now: power_state and/or foreground_app."""
+    for key, expected in condition.items():
+        if key == "power_state":
+            state = (await connector.get_power_state() or {}).get("state")
+            if state not in _as_list(expected):
+                return False
+        elif key == "foreground_app":
+            app_id = (await connector.get_foreground_app() or {}).get("appId")
+            index = await connector.app_index()
+            wanted = {index.resolve(app) or app for app in _as_list(expected)}
+            if app_id not in wanted:
+                return False
+        else:
+            raise ValueError(f"Unknown scene condition {key}")
+    return True
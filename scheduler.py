@@ -0,0 +1,232 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# priority classes, lower runs first
+URGENT = 0
+INTERACTIVE = 1
+BACKGROUND = 2
+
+# commands that must never wait behind a burst of knob turns
+URGENT_URIS = {
+    "ssap://system/turnOff",
+    "ssap://media.controls/pause",
+    "ssap://media.controls/stop",
+    "ssap://audio/setMute",
+    "ssap://com.webos.service.tvpower/power/turnOffScreen",
+}
+
+# sending these twice in a row does nothing more than sending them once
+IDEMPOTENT_URIS = URGENT_URIS | {
+    "ssap://media.controls/play",
+    "ssap://com.webos.service.tvpower/power/turnOnScreen",
+    "ssap://system.launcher/launch",
+    "ssap://tv/switchInput",
+    "ssap://tv/openChannel",
+}
+
+VOLUME_UP = "ssap://audio/volumeUp"
+VOLUME_DOWN = "ssap://audio/volumeDown"
+SET_VOLUME = "ssap://audio/setVolume"
+GET_VOLUME = "ssap://audio/getVolume"
+
+def priority_for(uri: str) -> int:
+    if uri in URGENT_URIS:
+        return URGENT
+    # reads can always wait for what the user is doing right now
+    name = uri.rsplit("/", 1)[-1]
+    if name.startswith(("get", "list")):
+        return BACKGROUND
+    return INTERACTIVE
+
+def _volume_of(response) -> Optional[int]:
+    """Current volume from a getVolume answer (older and newer webOS shapes)."""
+    if not response:
+        return None
+    if "volume" in response:
+        return response["volume"]
+    return (response.get("volumeStatus") or {}).get("volume")
+
+class TokenBucket:
+    """`rate` commands per second on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        self._refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self._refill()
+        self.tokens -= 1
+
+class _Job:
+    __slots__ = ("kind", "uri", "payload", "timeout", "futures", "volume_base", "volume_delta")
+
+    def __init__(self, kind: str, uri: str = None, payload: dict = None, timeout: float = None):
+        self.kind = kind  # "command", "volume" or "button"
+        self.uri = uri
+        self.payload = payload
+        self.timeout = timeout
+        self.futures: List[asyncio.Future] = []
+        # collapsed volume changes: absolute value (None = whatever the TV has now) plus steps
+        self.volume_base = None
+        self.volume_delta = 0
+
+class CommandScheduler:
+    """
+    Per-TV queue in front of WebOSClient.send_command and _send_input_button.
+    Commands leave in priority order (URGENT, INTERACTIVE, BACKGROUND) through a
+    token bucket, and redundant queued commands are collapsed: volume steps and
+    set_volume calls fold into one set_volume, and of queued idempotent commands
+    for the same uri (switch_input, set_mute, ...) only the latest one is sent.
+    """
+
+    def __init__(self, client, rate: float = 10.0, burst: int = 5):
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self._heap: list = []
+        self._order = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+        self._volume_job: Optional[_Job] = None
+        # the last volume job sent, the next one must see the volume it left behind
+        self._volume_task: Optional[asyncio.Task] = None
+        # uri -> the one queued job for an idempotent command, whose payload is the latest asked for
+        self._queued: Dict[str, _Job] = {}
+        self._running: set = set()
+
+    def _push(self, priority: int, job: _Job):
+        heapq.heappush(self._heap, (priority, next(self._order), job))
+        self._wakeup.set()
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+
+    def _attach(self, job: _Job) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        job.futures.append(future)
+        return future
+
+    async def submit_command(self, uri: str, payload: Optional[dict] = None, timeout: float = None):
+        if uri in (VOLUME_UP, VOLUME_DOWN, SET_VOLUME):
+            job = self._volume_job
+            if job is None:
+                job = self._volume_job = _Job("volume", timeout=timeout)
+                self._push(INTERACTIVE, job)
+            if uri == SET_VOLUME:
+                # an absolute value wipes out every step queued before it
+                job.volume_base = payload["volume"]
+                job.volume_delta = 0
+            else:
+                job.volume_delta += 1 if uri == VOLUME_UP else -1
+            return await self._attach(job)
+
+        if uri in IDEMPOTENT_URIS:
+            job = self._queued.get(uri)
+            if job is None:
+                job = self._queued[uri] = _Job("command", uri, payload, timeout)
+                self._push(priority_for(uri), job)
+            elif job.payload != payload:
+                # the last one asked for wins, everyone waiting on the queued job gets its answer
+                job.payload = payload
+                job.timeout = timeout
+            return await self._attach(job)
+
+        job = _Job("command", uri, payload, timeout)
+        self._push(priority_for(uri), job)
+        return await self._attach(job)
+
+    async def submit_button(self, button_name: str):
+        job = _Job("button", payload=button_name)
+        self._push(INTERACTIVE, job)
+        return await self._attach(job)
+
+    async def _run(self):
+        while True:
+            while not self._heap:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+            await self.bucket.acquire()
+            # pick after the token wait, so anything urgent that arrived meanwhile goes first
+            _, _, job = heapq.heappop(self._heap)
+            if job is self._volume_job:
+                self._volume_job = None
+            if job.kind == "command" and job.uri in IDEMPOTENT_URIS:
+                self._queued.pop(job.uri, None)
+            if job.kind == "button":
+                # buttons are fire and forget frames, keep them strictly in order
+                await self._execute(job)
+            else:
+                if job.kind == "volume":
+                    task = self._volume_task = asyncio.create_task(self._after(self._volume_task, job))
+                else:
+                    task = asyncio.create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job: _Job):
+        try:
+            if job.kind == "button":
+                result = await self.client._press_button(job.payload)
+            elif job.kind == "volume":
+                result = await self._apply_volume(job)
+            else:
+                result = await self.client._send_request(job.uri, job.payload, job.timeout)
+        except Exception as e:
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for future in job.futures:
+            if not future.done():
+                future.set_result(result)
+
+    async def _after(self, previous: Optional[asyncio.Task], job: _Job):
+        # a getVolume racing the previous setVolume would read a stale level and lose steps
+        if previous is not None:
+            await asyncio.gather(previous, return_exceptions=True)
+        await self._execute(job)
+
+    async def _apply_volume(self, job: _Job):
+        if len(job.futures) > 1:
+            logger.debug("Collapsed %d volume commands into one", len(job.futures))
+        if job.volume_base is None:
+            if job.volume_delta == 0:
+                return {"returnValue": True}
+            if abs(job.volume_delta) == 1:
+                return await self.client._send_request(VOLUME_UP if job.volume_delta > 0 else VOLUME_DOWN, None, job.timeout)
+            job.volume_base = _volume_of(await self.client._send_request(GET_VOLUME, None, job.timeout))
+            if job.volume_base is None:
+                raise ConnectionError("Could not read the current volume to apply queued volume steps")
+        volume = max(0, min(100, job.volume_base + job.volume_delta))
+        return await self.client._send_request(SET_VOLUME, {"volume": volume}, job.timeout)
+
+    def pending(self) -> int:
+        return len(self._heap)
+
+    async def close(self):
+        if self._worker:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        for _, _, job in self._heap:
+            for future in job.futures:
+                if not future.done():
+                    future.set_exception(ConnectionError("Scheduler closed"))
+        self._heap.clear()
+        self._volume_job = None
+        self._volume_task = None
+        self._queued.clear()
@@ -0,0 +1,310 @@
+"""
+Fleet spread over worker processes, for walls of hundreds of displays where one
+event loop runs out of CPU on TLS and JSON.
+
+    fleet = ShardedFleet(workers=8)
+    fleet.load_cached()
+    await fleet.start()
+    await fleet.connect()
+    results = await fleet.set_volume(20)        # ip -> result or the error, like Fleet
+    await fleet.close()
+
+Each worker owns a fixed shard of the TVs (by ip hash) and runs its own event
+loop with a regular Fleet; the coordinator only ships small pickled requests and
+results over one pipe per worker. Workers are spawned, so scripts using this need
+the usual `if __name__ == "__main__":` guard. Only the coordinator writes the device
+cache and the credential store; what the workers learn comes back with their answers.
+"""
+import asyncio
+import itertools
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional
+
+import client
+import credentials
+import device_cache
+import fleet as fleet_module
+
+logger = logging.getLogger(__name__)
+
+# how long past the per-TV timeout a worker may take to answer before it counts as stuck
+WORKER_GRACE = 2.0
+
+def shard_of(ip: str, workers: int) -> int:
+    """Stable worker index for a TV, the same in every run."""
+    return zlib.crc32(ip.encode()) % workers
+
+def _picklable(value):
+    # whatever a TV (or a failure) hands back has to survive the trip to the coordinator
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return RuntimeError(repr(value)) if isinstance(value, BaseException) else repr(value)
+
+def _pump(conn, loop: asyncio.AbstractEventLoop, inbox: asyncio.Queue):
+    """Blocking pipe reads on a thread, handed to the loop (pipes aren't selectable everywhere)."""
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            message = None
+        loop.call_soon_threadsafe(inbox.put_nowait, message)
+        if message is None:
+            return
+
+class _ShardCache(device_cache.DeviceCache):
+    """Keeps what a worker learns (MACs, last_seen) for the coordinator instead of racing it on the file."""
+
+    def __init__(self):
+        super().__init__()
+        self.updates: Dict[str, Dict] = {}
+
+    def remember(self, device_info: Dict):
+        self.updates[device_info["ip"]] = dict(device_info)
+
+    def forget(self, ip: str):
+        self.updates.pop(ip, None)
+
+class _ShardCredentials(credentials.CredentialStore):
+    """Reads the shared credential file, but leaves writing it to the coordinator."""
+
+    def __init__(self):
+        super().__init__()
+        self.updates: List[tuple] = []
+
+    def _write(self):
+        pass
+
+    def save(self, client_key: str, ip: Optional[str] = None, mac: Optional[str] = None, uuid: Optional[str] = None):
+        self.updates.append((client_key, ip, mac, uuid))
+        super().save(client_key, ip, mac, uuid)
+
+async def _serve(conn, tvs: List[Dict], concurrency: int):
+    cache = _ShardCache()
+    # the worker is its own process, every client in it picks this store up
+    keys = credentials.store = _ShardCredentials()
+    pool = fleet_module.Fleet(concurrency, cache=cache)
+    for tv_info in tvs:
+        pool.add(tv_info)
+    loop = asyncio.get_running_loop()
+    inbox: asyncio.Queue = asyncio.Queue()
+    threading.Thread(target=_pump, args=(conn, loop, inbox), daemon=True).start()
+    running = set()
+
+    async def handle(request_id: int, method: str, args: tuple, kwargs: dict,
+                     targets: Optional[List[str]], timeout: Optional[float]):
+        try:
+            if method == "connect":
+                results = await pool.connect(targets, timeout)
+            elif method == "health":
+                results = pool.health()
+            else:
+                ips = pool._targets(targets)
+                results = {ip: KeyError(f"Not connected to {ip}") for ip in ips if ip not in pool.clients}
+                connected = [ip for ip in ips if ip in pool.clients]
+                results.update(await pool.broadcast(method, *args, targets=connected, timeout=timeout, **kwargs))
+        except Exception as e:
+            results = {ip: e for ip in (targets or pool.tvs)}
+        updates, cache.updates = cache.updates, {}
+        saved_keys, keys.updates = keys.updates, []
+        conn.send((request_id, {ip: _picklable(result) for ip, result in results.items()}, updates, saved_keys))
+
+    while True:
+        message = await inbox.get()
+        if message is None:
+            break  # coordinator went away
+        request_id, method, args, kwargs, targets, timeout = message
+        if method == "close":
+            break
+        task = asyncio.create_task(handle(request_id, method, args, kwargs, targets, timeout))
+        running.add(task)
+        task.add_done_callback(running.discard)
+    for task in running:
+        task.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    await pool.close()
+
+def _worker_main(conn, tvs: List[Dict], concurrency: int, log_level: int):
+    logging.basicConfig(level=log_level, format=f"[worker {os.getpid()}] %(message)s")
+    try:
+        asyncio.run(_serve(conn, tvs, concurrency))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+class _Worker:
+    __slots__ = ("index", "process", "conn", "pending", "thread")
+
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.pending: Dict[int, asyncio.Future] = {}
+        self.thread: Optional[threading.Thread] = None
+
+class ShardedFleet:
+    """
+    Same calls as Fleet (connect, broadcast, any WebOSClient method, health, close),
+    with the TVs sharded over `workers` processes that each talk to their TVs on
+    their own core. Results come back per TV; a TV that hangs past `timeout` shows
+    up as a TimeoutError for just that ip, and a worker that stops answering as one
+    for each of its TVs, without holding up the rest.
+    """
+
+    def __init__(self, workers: Optional[int] = None, concurrency: int = 50,
+                 cache: Optional[device_cache.DeviceCache] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.concurrency = concurrency
+        self.cache = cache or device_cache.DeviceCache()
+        self.tvs: Dict[str, Dict] = {}
+        self._workers: List[_Worker] = []
+        self._ids = itertools.count()
+
+    def add(self, tv_info: Dict):
+        self.tvs[tv_info['ip']] = tv_info
+
+    def load_cached(self) -> List[Dict]:
+        cached = self.cache.fresh_devices()
+        for tv_info in cached:
+            self.add(tv_info)
+        return cached
+
+    def _shard(self, ips: Iterable[str]) -> Dict[int, List[str]]:
+        shards: Dict[int, List[str]] = {}
+        for ip in ips:
+            shards.setdefault(shard_of(ip, len(self._workers)), []).append(ip)
+        return shards
+
+    # ---- lifecycle ----
+    async def start(self):
+        """Spawn the workers, each with its shard of the TVs known so far."""
+        # spawn behaves the same on every OS and never inherits a running event loop
+        context = multiprocessing.get_context("spawn")
+        loop = asyncio.get_running_loop()
+        shards: Dict[int, List[Dict]] = {i: [] for i in range(self.workers)}
+        for ip, tv_info in self.tvs.items():
+            shards[shard_of(ip, self.workers)].append(tv_info)
+        for index in range(self.workers):
+            parent_conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_worker_main, name=f"lg-fleet-{index}", daemon=True,
+                args=(child_conn, shards[index], self.concurrency, logging.getLogger().level),
+            )
+            process.start()
+            child_conn.close()
+            worker = _Worker(index, process, parent_conn)
+            worker.thread = threading.Thread(target=self._collect, args=(worker, loop), daemon=True)
+            worker.thread.start()
+            self._workers.append(worker)
+        logger.info("Started %d workers for %d TVs", self.workers, len(self.tvs))
+        return self
+
+    def _collect(self, worker: _Worker, loop: asyncio.AbstractEventLoop):
+        """Reader thread: hand every result from a worker to the coroutine waiting for it."""
+        while True:
+            try:
+                request_id, results, updates, saved_keys = worker.conn.recv()
+            except (EOFError, OSError):
+                loop.call_soon_threadsafe(self._worker_lost, worker)
+                return
+            loop.call_soon_threadsafe(self._resolve, worker, request_id, results, updates, saved_keys)
+
+    def _resolve(self, worker: _Worker, request_id: int, results: dict,
+                 updates: Dict[str, Dict], saved_keys: List[tuple]):
+        for ip, tv_info in updates.items():
+            self.tvs[ip] = tv_info
+            self.cache.remember(tv_info)
+        for client_key, ip, mac, uuid in saved_keys:
+            credentials.store.save(client_key, ip=ip, mac=mac, uuid=uuid)
+        future = worker.pending.pop(request_id, None)
+        if future and not future.done():
+            future.set_result(results)
+
+    @staticmethod
+    def _worker_lost(worker: _Worker):
+        for future in worker.pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError(f"Fleet worker {worker.index} exited"))
+        worker.pending.clear()
+
+    async def close(self):
+        for worker in self._workers:
+            try:
+                worker.conn.send((next(self._ids), "close", (), {}, None, None))
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._workers.clear()
+
+    # ---- requests ----
+    async def _ask(self, worker: _Worker, method: str, args: tuple, kwargs: dict,
+                   targets: Optional[List[str]], timeout: Optional[float]) -> Dict[str, object]:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        worker.pending[request_id] = future
+        ips = targets if targets is not None else [ip for ip in self.tvs if shard_of(ip, len(self._workers)) == worker.index]
+        deadline = None
+        if timeout is not None:
+            # the worker times out each TV itself and talks to `concurrency` of them at a time
+            deadline = timeout * max(1, math.ceil(len(ips) / self.concurrency)) + WORKER_GRACE
+        try:
+            worker.conn.send((request_id, method, args, kwargs, targets, timeout))
+            return await asyncio.wait_for(future, deadline)
+        except Exception as e:
+            worker.pending.pop(request_id, None)
+            if isinstance(e, asyncio.TimeoutError):
+                e = TimeoutError(f"Fleet worker {worker.index} did not answer {method} within {deadline:.1f}s")
+            return {ip: e for ip in ips}
+
+    async def _fan_out(self, method: str, args: tuple = (), kwargs: Optional[dict] = None,
+                       targets: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Dict[str, object]:
+        if not self._workers:
+            raise RuntimeError("ShardedFleet not started, call start() first")
+        if targets is None:
+            jobs = [(worker, None) for worker in self._workers]
+        else:
+            shards = self._shard(targets)
+            jobs = [(self._workers[index], ips) for index, ips in shards.items()]
+        answers = await asyncio.gather(*(self._ask(w, method, args, kwargs or {}, ips, timeout) for w, ips in jobs))
+        results: Dict[str, object] = {}
+        for answer in answers:
+            results.update(answer)
+        return results
+
+    async def connect(self, targets: Optional[Iterable[str]] = None, timeout: Optional[float] = None) -> Dict[str, object]:
+        """Connect every worker to its TVs; returns ip -> None or the error."""
+        results = await self._fan_out("connect", targets=targets, timeout=timeout)
+        connected = sum(1 for r in results.values() if r is None)
+        logger.info("Sharded fleet connected to %d/%d TVs", connected, len(results))
+        return results
+
+    async def broadcast(self, method: str, *args, targets: Optional[Iterable[str]] = None,
+                        timeout: Optional[float] = None, **kwargs) -> Dict[str, object]:
+        """Call `method` on every connected TV (or just `targets`) across all workers."""
+        return await self._fan_out(method, args, kwargs, targets, timeout)
+
+    async def health(self) -> Dict[str, dict]:
+        return await self._fan_out("health")
+
+    failures = staticmethod(fleet_module.Fleet.failures)
+
+    def __getattr__(self, name):
+        # same shortcut as Fleet: sharded.set_volume(20) is broadcast("set_volume", 20)
+        if name.startswith('_') or not callable(getattr(client.WebOSClient, name, None)):
+            raise AttributeError(name)
+
+        async def fan_out(*args, targets: Optional[Iterable[str]] = None, timeout: Optional[float] = None, **kwargs):
+            return await self.broadcast(name, *args, targets=targets, timeout=timeout, **kwargs)
+        return fan_out
@@ -0,0 +1,171 @@
+"""
+Non-blocking terminal input for the console, so the event loop (heartbeats,
+incoming frames, background refreshes) keeps running while we wait on the user.
+"""
+import asyncio
+import os
+import sys
+import threading
+from typing import Optional
+
+# raw key bytes -> key names, for POSIX terminals in cbreak mode
+POSIX_KEYS = {
+    "\x1b[A": "UP", "\x1bOA": "UP",
+    "\x1b[B": "DOWN", "\x1bOB": "DOWN",
+    "\x1b[C": "RIGHT", "\x1bOC": "RIGHT",
+    "\x1b[D": "LEFT", "\x1bOD": "LEFT",
+    "\r": "ENTER", "\n": "ENTER",
+    "\x7f": "BACKSPACE", "\x08": "BACKSPACE",
+    "\x1b": "ESC",
+}
+# second character after the 0x00/0xE0 prefix msvcrt gives for special keys
+WINDOWS_KEYS = {"H": "UP", "P": "DOWN", "M": "RIGHT", "K": "LEFT"}
+
+# bytes read from stdin past the last line ainput() returned
+_stdin_buffer = b""
+
+async def ainput(prompt: str = "") -> str:
+    """
+    input() that leaves the loop free while the user types. On POSIX stdin is read
+    through the event loop like RawKeys does; elsewhere (or when stdin is a plain
+    file) a daemon thread waits on input(), so Ctrl-C never waits for Enter.
+    """
+    loop = asyncio.get_running_loop()
+    sys.stdout.write(prompt)
+    sys.stdout.flush()
+    if os.name != "nt":
+        try:
+            return await _read_line_posix(loop)
+        except PermissionError:
+            pass  # regular files can't be watched by the selector
+    return await _read_line_thread(loop)
+
+async def _read_line_posix(loop: asyncio.AbstractEventLoop) -> str:
+    global _stdin_buffer
+    fd = sys.stdin.fileno()
+    future = loop.create_future()
+
+    def on_readable():
+        global _stdin_buffer
+        data = os.read(fd, 4096)
+        if future.done():
+            _stdin_buffer += data
+        elif not data:
+            # like input(): a last line without a newline still counts, nothing at all is EOF
+            if _stdin_buffer:
+                _stdin_buffer += b"\n"
+                future.set_result(None)
+            else:
+                future.set_exception(EOFError())
+        else:
+            _stdin_buffer += data
+            if b"\n" in _stdin_buffer:
+                future.set_result(None)
+
+    if b"\n" not in _stdin_buffer:
+        loop.add_reader(fd, on_readable)
+        try:
+            await future
+        finally:
+            loop.remove_reader(fd)
+    line, _, _stdin_buffer = _stdin_buffer.partition(b"\n")
+    return line.decode("utf-8", errors="replace").rstrip("\r")
+
+async def _read_line_thread(loop: asyncio.AbstractEventLoop) -> str:
+    future = loop.create_future()
+
+    def settle(method, value):
+        if not future.done():
+            getattr(future, method)(value)
+
+    def read():
+        try:
+            line = input()
+        except BaseException as e:
+            outcome = ("set_exception", e)
+        else:
+            outcome = ("set_result", line)
+        try:
+            loop.call_soon_threadsafe(settle, *outcome)
+        except RuntimeError:
+            pass  # the loop is gone already
+
+    # a daemon thread, unlike the default executor, doesn't keep the process alive on exit
+    threading.Thread(target=read, daemon=True).start()
+    return await future
+
+def _split_keys(chunk: str):
+    """One read can hold several keys (auto-repeat), split it into key names."""
+    i = 0
+    while i < len(chunk):
+        if chunk[i] == "\x1b" and chunk[i + 1:i + 2] in ("[", "O") and i + 2 < len(chunk):
+            sequence = chunk[i:i + 3]
+            i += 3
+        else:
+            sequence = chunk[i]
+            i += 1
+        yield POSIX_KEYS.get(sequence, sequence)
+
+class RawKeys:
+    """
+    Key-at-a-time input without Enter or echo, as an async context manager:
+
+        async with RawKeys() as keys:
+            key = await keys.get()   # "UP", "ENTER", "BACKSPACE", "ESC", "+", "q", ...
+
+    On POSIX the terminal is switched to cbreak mode and read through the event
+    loop; on Windows a small thread polls msvcrt. The terminal is restored on exit.
+    """
+
+    def __init__(self):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._fd = None
+        self._saved_mode = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def __aenter__(self):
+        self._loop = asyncio.get_running_loop()
+        if os.name == "nt":
+            self._thread = threading.Thread(target=self._poll_windows, daemon=True)
+            self._thread.start()
+        else:
+            import termios
+            import tty
+            self._fd = sys.stdin.fileno()
+            self._saved_mode = termios.tcgetattr(self._fd)
+            tty.setcbreak(self._fd)
+            self._loop.add_reader(self._fd, self._read_posix)
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._thread:
+            self._stop.set()
+            await asyncio.to_thread(self._thread.join)
+        else:
+            import termios
+            self._loop.remove_reader(self._fd)
+            termios.tcsetattr(self._fd, termios.TCSADRAIN, self._saved_mode)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+    def _read_posix(self):
+        chunk = os.read(self._fd, 64).decode("utf-8", errors="ignore")
+        for key in _split_keys(chunk):
+            self._queue.put_nowait(key)
+
+    def _poll_windows(self):
+        import msvcrt
+        while not self._stop.is_set():
+            if not msvcrt.kbhit():
+                self._stop.wait(0.005)
+                continue
+            char = msvcrt.getwch()
+            if char in ("\x00", "\xe0"):
+                key = WINDOWS_KEYS.get(msvcrt.getwch())
+            else:
+                key = POSIX_KEYS.get(char, char)
+            if key:
+                self._loop.call_soon_threadsafe(self._queue.put_nowait, key)
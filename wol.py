@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import re
+import socket
+from typing import Optional
+
+import client
+import discover
+
+logger = logging.getLogger(__name__)
+
+# how often the magic packet is repeated while waiting, the first one is easily lost on Wi-Fi
+RESEND_INTERVAL = 1.0
+# how often port 3001 is probed while the TV boots
+PROBE_INTERVAL = 0.25
+
+def normalize_mac(mac: str) -> str:
+    digits = re.sub(r"[^0-9a-fA-F]", "", mac or "")
+    if len(digits) != 12:
+        raise ValueError(f"Invalid MAC address {mac!r}")
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2)).lower()
+
+def mac_from_arp(ip: str) -> Optional[str]:
+    """The MAC the kernel learned for `ip` (Linux ARP table), e.g. right after SSDP discovery."""
+    try:
+        with open("/proc/net/arp") as f:
+            next(f)  # header
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 4 and fields[0] == ip and fields[3] != "00:00:00:00:00:00":
+                    return normalize_mac(fields[3])
+    except (OSError, StopIteration, ValueError):
+        pass
+    return None
+
+def send_magic_packet(mac: str, broadcast: str = "255.255.255.255", port: int = 9):
+    """Broadcast a Wake-on-LAN magic packet: 6 x 0xFF followed by the MAC 16 times."""
+    packet = b"\xff" * 6 + bytes.fromhex(normalize_mac(mac).replace(":", "")) * 16
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.sendto(packet, (broadcast, port))
+    logger.debug("Sent magic packet to %s via %s:%d", mac, broadcast, port)
+
+async def _probe_port(ip: str, port: int, ready: asyncio.Event):
+    """Keep trying to open a TCP connection until the TV's websocket port accepts one."""
+    while not ready.is_set():
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), PROBE_INTERVAL * 2)
+            writer.close()
+            ready.set()
+            return
+        except (OSError, asyncio.TimeoutError):
+            await asyncio.sleep(PROBE_INTERVAL)
+
+async def _watch_ssdp(ip: str, ready: asyncio.Event, timeout: float):
+    """A TV that answers M-SEARCH again has its network stack up."""
+    while not ready.is_set():
+        async for device_info in discover.discover_lg_tvs_async(min(timeout, 5)):
+            if device_info["ip"] == ip:
+                ready.set()
+                return
+
+async def wait_until_ready(ip: str, timeout: float = 60, mac: Optional[str] = None, **client_kwargs) -> client.WebOSClient:
+    """
+    Wait for a waking TV and return a registered WebOSClient for it.
+    TCP probes on port 3001 and SSDP answers race to tell us the TV is back,
+    then registration is tried straight away (and retried until it sticks).
+    With a MAC the magic packet is re-sent every second while we wait.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    ready = asyncio.Event()
+    helpers = [asyncio.create_task(_probe_port(ip, 3001, ready)),
+               asyncio.create_task(_watch_ssdp(ip, ready, timeout))]
+
+    async def keep_waking():
+        while not ready.is_set():
+            send_magic_packet(mac)
+            await asyncio.sleep(RESEND_INTERVAL)
+    if mac:
+        helpers.append(asyncio.create_task(keep_waking()))
+
+    try:
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"TV at {ip} was not ready within {timeout}s")
+            try:
+                await asyncio.wait_for(ready.wait(), remaining)
+            except asyncio.TimeoutError:
+                continue
+            connector = client.WebOSClient(ip, mac=mac, **client_kwargs)
+            try:
+                # a first pairing may wait longer than we have left, the deadline still holds
+                await asyncio.wait_for(connector.connect(open_timeout=max(0.5, min(3, deadline - loop.time()))),
+                                       max(0.5, deadline - loop.time()))
+            except PermissionError:
+                raise
+            except Exception as e:
+                # port open but webOS services not up yet
+                logger.debug("%s not accepting registration yet: %r", ip, e)
+                await connector.close()
+                await asyncio.sleep(PROBE_INTERVAL)
+                continue
+            await _wait_for_active(connector, deadline)
+            logger.info("TV at %s is ready", ip)
+            return connector
+    finally:
+        ready.set()
+        for task in helpers:
+            task.cancel()
+        await asyncio.gather(*helpers, return_exceptions=True)
+
+async def _wait_for_active(connector: client.WebOSClient, deadline: float):
+    """After registration, poll the power state until the screen is really on (best effort)."""
+    loop = asyncio.get_running_loop()
+    while loop.time() < deadline:
+        try:
+            state = await connector.get_power_state()
+        except Exception:
+            return
+        # TVs without the tvpower service answer with an error (None), nothing to wait for then
+        if not state or state.get("state", "Active") == "Active":
+            return
+        await asyncio.sleep(PROBE_INTERVAL)
+
+async def power_on(ip: str, mac: Optional[str] = None, timeout: float = 60, **client_kwargs) -> client.WebOSClient:
+    """Wake a TV with Wake-on-LAN and return a registered client as soon as it is ready."""
+    mac = mac or mac_from_arp(ip)
+    if not mac:
+        raise ValueError(f"No MAC address known for {ip}, connect to it once while it is on (or pass mac=)")
+    send_magic_packet(mac)
+    return await wait_until_ready(ip, timeout, mac=mac, **client_kwargs)